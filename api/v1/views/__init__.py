@@ -1,8 +1,137 @@
 #!/usr/bin/python3
 """create blueprint"""
-from flask import Blueprint
+import base64
+import binascii
+import json
+from flask import Blueprint, Response, abort, request
+import models
+from models.engine import model_codec
+from models.engine.model_codec import format_datetime, parse_datetime
 
 app_views = Blueprint('app_views', __name__, url_prefix='/api/v1')
+PAGE_ORDERS = {"id": ("id",), "created_at": ("created_at", "id")}
+MAX_PAGE_SIZE = 1000
+
+
+def to_json(item):
+    """JSON bytes of a model instance or of a record from Query.only"""
+    if isinstance(item, dict):
+        return json.dumps(item, sort_keys=True,
+                          separators=(",", ":")).encode()
+    return item.to_json()
+
+
+def jsonify_list(objs):
+    """JSON list of the to_dict of objs, joined from their cached JSON"""
+    return Response(b"[" + b",".join(to_json(obj) for obj in objs) +
+                    b"]\n", mimetype="application/json")
+
+
+def requested_fields(query):
+    """Entries asked for with ?fields=a,b,c, None when not given;
+    400 when one is not an entry of the records of the class queried"""
+    if 'fields' not in request.args:
+        return None
+    fields = tuple(field.strip() for field in
+                   request.args['fields'].split(',') if field.strip())
+    cls = query.cls
+    if isinstance(cls, str):
+        cls = models.classes[cls]
+    for field in fields:
+        if field not in model_codec.for_class(cls).fields:
+            abort(400, 'Unknown field {}'.format(field))
+    return fields
+
+
+def jsonify_one(query):
+    """JSON object of the first object of query, restricted to
+    ?fields= when given; 404 when there is none"""
+    fields = requested_fields(query)
+    if fields is not None:
+        query = query.only(*fields)
+    item = query.first()
+    if item is None:
+        abort(404)
+    return Response(to_json(item) + b"\n", mimetype="application/json")
+
+
+def encode_cursor(order, item):
+    """Opaque cursor pointing after item, a model instance or a record,
+    in the given page order"""
+    values = [order]
+    for field in PAGE_ORDERS[order]:
+        if isinstance(item, dict):
+            values.append(item[field])
+        else:
+            value = getattr(item, field)
+            values.append(value if field == "id" else
+                          format_datetime(value))
+    return base64.urlsafe_b64encode(
+        json.dumps(values, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(order, seek values) of a cursor made by encode_cursor"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        order = values.pop(0)
+        if len(values) != len(PAGE_ORDERS[order]):
+            raise ValueError(cursor)
+        seek = []
+        for field, value in zip(PAGE_ORDERS[order], values):
+            if field != "id":
+                value = parse_datetime(value)
+            elif not isinstance(value, str):
+                raise TypeError(cursor)
+            seek.append(value)
+        return order, tuple(seek)
+    except (binascii.Error, ValueError, TypeError, KeyError,
+            IndexError, AttributeError):
+        abort(400, 'Invalid cursor')
+
+
+def jsonify_page(query):
+    """JSON list of the objects of query, or one page of them when the
+    request has ?limit= or ?cursor= (keyset pagination ordered by
+    ?order_by=id or created_at): {"next": cursor or null, "results": [...]}
+    Each object is restricted to ?fields= when given.
+    """
+    fields = requested_fields(query)
+    if 'limit' not in request.args and 'cursor' not in request.args:
+        if fields is not None:
+            query = query.only(*fields)
+        return jsonify_list(query)
+    try:
+        limit = int(request.args.get('limit', 100))
+    except ValueError:
+        abort(400, 'Invalid limit')
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        abort(400, 'Invalid limit')
+    if 'cursor' in request.args:
+        order, seek = decode_cursor(request.args['cursor'])
+        query = query.order_by(*PAGE_ORDERS[order]).after(*seek)
+    else:
+        order = request.args.get('order_by', 'id')
+        if order not in PAGE_ORDERS:
+            abort(400, 'Invalid order_by')
+        query = query.order_by(*PAGE_ORDERS[order])
+    if fields is not None:
+        query = query.only(*(fields + PAGE_ORDERS[order]))
+    objs = query.limit(limit + 1).all()
+    cursor = None
+    if len(objs) > limit:
+        objs = objs[:limit]
+        cursor = encode_cursor(order, objs[-1])
+    if fields is not None:
+        for record in objs:
+            for field in PAGE_ORDERS[order]:
+                if field not in fields:
+                    del record[field]
+    results = b",".join(to_json(obj) for obj in objs)
+    return Response(b'{"next":' + json.dumps(cursor).encode() +
+                    b',"results":[' + results + b"]}\n",
+                    mimetype="application/json")
+
 
 if app_views is not None:
     from api.v1.views.index import *
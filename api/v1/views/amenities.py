@@ -1,6 +1,6 @@
 #!/usr/bin/python3
 """amenities"""
-from api.v1.views import app_views
+from api.v1.views import app_views, jsonify_one, jsonify_page
 from flask import jsonify, abort, request
 from models import storage
 from models.amenity import Amenity
@@ -11,19 +11,13 @@ import uuid
 @app_views.route('/amenities/', methods=['GET'])
 def list_amenities():
     '''Retrieves a list of all Amenity objects'''
-    list_amenities = [obj.to_dict() for obj in storage.all("Amenity").values()]
-    return jsonify(list_amenities)
+    return jsonify_page(storage.query("Amenity"))
 
 
 @app_views.route('/amenities/<amenity_id>', methods=['GET'])
 def get_amenity(amenity_id):
     '''Retrieves an Amenity object'''
-    all_amenities = storage.all("Amenity").values()
-    amenity_obj = [obj.to_dict() for obj in all_amenities
-                   if obj.id == amenity_id]
-    if amenity_obj == []:
-        abort(404)
-    return jsonify(amenity_obj[0])
+    return jsonify_one(storage.query("Amenity").filter(id=amenity_id))
 
 
 @app_views.route('/amenities/<amenity_id>', methods=['DELETE'])
@@ -71,5 +65,6 @@ def updates_amenity(amenity_id):
     for obj in all_amenities:
         if obj.id == amenity_id:
             obj.name = request.json['name']
+            storage.new(obj)
     storage.save()
     return jsonify(amenity_obj[0]), 200
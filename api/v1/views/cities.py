@@ -1,6 +1,6 @@
 #!/usr/bin/python3
 """cities"""
-from api.v1.views import app_views
+from api.v1.views import app_views, jsonify_one, jsonify_page
 from flask import jsonify, abort, request
 from models import storage
 from models.city import City
@@ -13,13 +13,9 @@ import uuid
 @app_views.route('/states/<state_id>/cities/', methods=['GET'])
 def list_cities_of_state(state_id):
     '''Retrieves a list of all City objects'''
-    all_states = storage.all("State").values()
-    state_obj = [obj.to_dict() for obj in all_states if obj.id == state_id]
-    if state_obj == []:
+    if storage.get("State", state_id) is None:
         abort(404)
-    list_cities = [obj.to_dict() for obj in storage.all("City").values()
-                   if state_id == obj.state_id]
-    return jsonify(list_cities)
+    return jsonify_page(storage.query("City").filter(state_id=state_id))
 
 
 @app_views.route('/states/<state_id>/cities', methods=['POST'])
@@ -45,11 +41,7 @@ def create_city(state_id):
 @app_views.route('/cities/<city_id>', methods=['GET'])
 def get_city(city_id):
     '''Retrieves a City object'''
-    all_cities = storage.all("City").values()
-    city_obj = [obj.to_dict() for obj in all_cities if obj.id == city_id]
-    if city_obj == []:
-        abort(404)
-    return jsonify(city_obj[0])
+    return jsonify_one(storage.query("City").filter(id=city_id))
 
 
 @app_views.route('/cities/<city_id>', methods=['DELETE'])
@@ -80,5 +72,6 @@ def updates_city(city_id):
     for obj in all_cities:
         if obj.id == city_id:
             obj.name = request.json['name']
+            storage.new(obj)
     storage.save()
     return jsonify(city_obj[0]), 200
@@ -1,18 +1,24 @@
 #!/usr/bin/python3
 """index"""
 from api.v1.views import app_views
-from flask import jsonify
+from flask import jsonify, abort, request
 from models import storage
+from models.base_model import BaseModel
 from models.user import User
 from models.place import Place
 from models.state import State
 from models.city import City
 from models.amenity import Amenity
 from models.review import Review
+from models.engine.loader import check_foreign_keys
 
 classes = {"users": "User", "places": "Place", "states": "State",
            "cities": "City", "amenities": "Amenity",
            "reviews": "Review"}
+required = {"User": ("email", "password"), "Place": ("city_id", "user_id",
+                                                     "name"),
+            "State": ("name",), "City": ("state_id", "name"),
+            "Amenity": ("name",), "Review": ("place_id", "user_id", "text")}
 
 
 @app_views.route('/status', methods=['GET'])
@@ -24,7 +30,49 @@ def status():
 @app_views.route('/stats', methods=['GET'])
 def count():
     '''retrieves the number of each objects by type'''
-    count_dict = {}
-    for cls in classes:
-        count_dict[cls] = storage.count(classes[cls])
-    return jsonify(count_dict)
+    counts = storage.counts(classes.values())
+    return jsonify({cls: counts[classes[cls]] for cls in classes})
+
+
+@app_views.route('/stats/cache', methods=['GET'])
+def cache_stats():
+    '''retrieves the hit and miss counts of the model caches'''
+    stats = {'to_dict': BaseModel.cache_stats()}
+    if hasattr(storage, 'cache_stats'):
+        stats['get'] = storage.cache_stats()
+        stats['results'] = storage.result_cache_stats()
+    return jsonify(stats)
+
+
+@app_views.route('/stats/pool', methods=['GET'])
+def pool_stats():
+    '''retrieves the connection pool metrics of the database storage'''
+    if not hasattr(storage, 'pool_stats'):
+        abort(404)
+    return jsonify(storage.pool_stats())
+
+
+@app_views.route('/<resource>/bulk', methods=['POST'])
+def bulk_create(resource):
+    '''creates many objects from a JSON list, saving them at once'''
+    if resource not in classes:
+        abort(404)
+    items = request.get_json(silent=True)
+    if not isinstance(items, list) or not all(
+            isinstance(item, dict) for item in items):
+        abort(400, 'Not a JSON list')
+    name = classes[resource]
+    records = []
+    for item in items:
+        for attr in required[name]:
+            if attr not in item:
+                abort(400, 'Missing {}'.format(attr))
+        records.append({key: val for key, val in item.items()
+                        if key[:1] != "_" and
+                        key not in ("id", "created_at", "updated_at")})
+    try:
+        check_foreign_keys(storage, name, list(enumerate(records, 1)))
+        objs = storage.new_many(records, name)
+    except ValueError as error:
+        abort(400, str(error))
+    return jsonify([obj.to_dict() for obj in objs]), 201
@@ -1,6 +1,6 @@
 #!/usr/bin/python3
 """places"""
-from api.v1.views import app_views
+from api.v1.views import app_views, jsonify_one, jsonify_page
 from flask import jsonify, abort, request
 from models import storage
 from models.city import City
@@ -13,23 +13,15 @@ import uuid
 @app_views.route('/cities/<city_id>/places/', methods=['GET'])
 def list_places_of_city(city_id):
     '''Retrieves a list of all Place objects in city'''
-    all_cities = storage.all("City").values()
-    city_obj = [obj.to_dict() for obj in all_cities if obj.id == city_id]
-    if city_obj == []:
+    if storage.get("City", city_id) is None:
         abort(404)
-    list_places = [obj.to_dict() for obj in storage.all("Place").values()
-                   if city_id == obj.city_id]
-    return jsonify(list_places)
+    return jsonify_page(storage.query("Place").filter(city_id=city_id))
 
 
 @app_views.route('/places/<place_id>', methods=['GET'])
 def get_place(place_id):
     '''Retrieves a Place object'''
-    all_places = storage.all("Place").values()
-    place_obj = [obj.to_dict() for obj in all_places if obj.id == place_id]
-    if place_obj == []:
-        abort(404)
-    return jsonify(place_obj[0])
+    return jsonify_one(storage.query("Place").filter(id=place_id))
 
 
 @app_views.route('/places/<place_id>', methods=['DELETE'])
@@ -119,5 +111,6 @@ def updates_place(place_id):
                 obj.latitude = request.json['latitude']
             if 'longitude' in request.get_json():
                 obj.longitude = request.json['longitude']
+            storage.new(obj)
     storage.save()
     return jsonify(place_obj[0]), 200
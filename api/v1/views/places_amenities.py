@@ -1,6 +1,6 @@
 #!/usr/bin/python3
 """places_amenities"""
-from api.v1.views import app_views
+from api.v1.views import app_views, jsonify_list
 from flask import jsonify, abort, request
 from models import storage
 from models.place import Place
@@ -14,16 +14,11 @@ if getenv('HBNB_TYPE_STORAGE') == 'db':
     @app_views.route('/places/<place_id>/amenities/', methods=['GET'])
     def list_amenities_of_place(place_id):
         ''' Retrieves a list of all Amenity objects of a Place '''
-        all_places = storage.all("Place").values()
-        place_obj = [obj.to_dict() for obj in all_places if obj.id == place_id]
-        if place_obj == []:
+        place = storage.query("Place").filter(id=place_id).load(
+            "amenities").first()
+        if place is None:
             abort(404)
-        list_amenities = []
-        for obj in all_places:
-            if obj.id == place_id:
-                for amenity in obj.amenities:
-                    list_amenities.append(amenity.to_dict())
-        return jsonify(list_amenities)
+        return jsonify_list(place.amenities)
 
     @app_views.route('/places/<place_id>/amenities/<amenity_id>',
                      methods=['POST'])
@@ -82,16 +77,11 @@ else:
     @app_views.route('/places/<place_id>/amenities/', methods=['GET'])
     def list_amenities_of_place(place_id):
         ''' Retrieves a list of all Amenity objects of a Place '''
-        all_places = storage.all("Place").values()
-        place_obj = [obj.to_dict() for obj in all_places if obj.id == place_id]
-        if place_obj == []:
+        place = storage.query("Place").filter(id=place_id).load(
+            "amenities").first()
+        if place is None:
             abort(404)
-        list_amenities = []
-        for obj in all_places:
-            if obj.id == place_id:
-                for amenity in obj.amenities:
-                    list_amenities.append(amenity.to_dict())
-        return jsonify(list_amenities)
+        return jsonify_list(place.amenities)
 
     @app_views.route('/places/<place_id>/amenities/<amenity_id>',
                      methods=['POST'])
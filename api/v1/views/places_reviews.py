@@ -1,6 +1,6 @@
 #!/usr/bin/python3
 """places_reviews"""
-from api.v1.views import app_views
+from api.v1.views import app_views, jsonify_one, jsonify_page
 from flask import jsonify, abort, request
 from models import storage
 from models.place import Place
@@ -13,13 +13,9 @@ import uuid
 @app_views.route('/places/<place_id>/reviews/', methods=['GET'])
 def list_reviews_of_place(place_id):
     ''' Retrieves a list of all Review objects of a Place '''
-    all_places = storage.all("Place").values()
-    place_obj = [obj.to_dict() for obj in all_places if obj.id == place_id]
-    if place_obj == []:
+    if storage.get("Place", place_id) is None:
         abort(404)
-    list_reviews = [obj.to_dict() for obj in storage.all("Review").values()
-                    if place_id == obj.place_id]
-    return jsonify(list_reviews)
+    return jsonify_page(storage.query("Review").filter(place_id=place_id))
 
 
 @app_views.route('/places/<place_id>/reviews', methods=['POST'])
@@ -52,11 +48,7 @@ def create_review(place_id):
 @app_views.route('/reviews/<review_id>', methods=['GET'])
 def get_review(review_id):
     '''Retrieves a Review object '''
-    all_reviews = storage.all("Review").values()
-    review_obj = [obj.to_dict() for obj in all_reviews if obj.id == review_id]
-    if review_obj == []:
-        abort(404)
-    return jsonify(review_obj[0])
+    return jsonify_one(storage.query("Review").filter(id=review_id))
 
 
 @app_views.route('/reviews/<review_id>', methods=['DELETE'])
@@ -88,5 +80,6 @@ def updates_review(review_id):
         for obj in all_reviews:
             if obj.id == review_id:
                 obj.text = request.json['text']
+                storage.new(obj)
         storage.save()
     return jsonify(review_obj[0]), 200
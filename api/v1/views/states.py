@@ -1,6 +1,6 @@
 #!/usr/bin/python3
 """states"""
-from api.v1.views import app_views
+from api.v1.views import app_views, jsonify_one, jsonify_page
 from flask import jsonify, abort, request
 from models import storage
 from models.state import State
@@ -11,18 +11,13 @@ import uuid
 @app_views.route('/states/', methods=['GET'])
 def list_states():
     '''Retrieves a list of all State objects'''
-    list_states = [obj.to_dict() for obj in storage.all("State").values()]
-    return jsonify(list_states)
+    return jsonify_page(storage.query("State"))
 
 
 @app_views.route('/states/<state_id>', methods=['GET'])
 def get_state(state_id):
     '''Retrieves a State object'''
-    all_states = storage.all("State").values()
-    state_obj = [obj.to_dict() for obj in all_states if obj.id == state_id]
-    if state_obj == []:
-        abort(404)
-    return jsonify(state_obj[0])
+    return jsonify_one(storage.query("State").filter(id=state_id))
 
 
 @app_views.route('/states/<state_id>', methods=['DELETE'])
@@ -68,5 +63,6 @@ def updates_state(state_id):
     for obj in all_states:
         if obj.id == state_id:
             obj.name = request.json['name']
+            storage.new(obj)
     storage.save()
     return jsonify(state_obj[0]), 200
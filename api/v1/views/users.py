@@ -1,6 +1,6 @@
 #!/usr/bin/python3
 """users"""
-from api.v1.views import app_views
+from api.v1.views import app_views, jsonify_one, jsonify_page
 from flask import jsonify, abort, request
 from models import storage
 from models.user import User
@@ -12,18 +12,13 @@ import uuid
 @app_views.route('/users', methods=['GET'])
 def list_users():
     '''Retrieves a list of all User objects'''
-    list_users = [obj.to_dict() for obj in storage.all("User").values()]
-    return jsonify(list_users)
+    return jsonify_page(storage.query("User"))
 
 
 @app_views.route('/users/<user_id>', methods=['GET'])
 def get_user(user_id):
     '''Retrieves a User object'''
-    all_users = storage.all("User").values()
-    user_obj = [obj.to_dict() for obj in all_users if obj.id == user_id]
-    if user_obj == []:
-        abort(404)
-    return jsonify(user_obj[0])
+    return jsonify_one(storage.query("User").filter(id=user_id))
 
 
 @app_views.route('/users/<user_id>', methods=['DELETE'])
@@ -88,5 +83,6 @@ def updates_user(user_id):
                     obj.last_name = request.json['last_name']
             except:
                 pass
+            storage.new(obj)
     storage.save()
     return jsonify(user_obj[0]), 200
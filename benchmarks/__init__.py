@@ -0,0 +1,4 @@
+#!/usr/bin/python3
+'''
+    Package initializer
+'''
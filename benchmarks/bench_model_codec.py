@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+'''
+    Compare model_codec with the strptime/strftime path BaseModel used
+    before it: time per object to decode a record (as reload does) and to
+    encode an instance (as save and the list endpoints do), twice in a
+    row so the second encode shows the cached timestamps.
+
+    Usage: python3 -m benchmarks.bench_model_codec [count]
+    The default count is 100000.
+'''
+import sys
+import time
+import uuid
+from datetime import datetime
+from benchmarks.bench_snapshot_format import make_records
+from models.engine import model_codec
+from models.place import Place
+
+
+def legacy_decode(record):
+    '''
+        Build a Place the way BaseModel.__init__ did
+    '''
+    obj = Place.__new__(Place)
+    kwargs = dict(record)
+    if kwargs.get("created_at"):
+        kwargs["created_at"] = datetime.strptime(
+            kwargs["created_at"], "%Y-%m-%dT%H:%M:%S.%f")
+    else:
+        obj.created_at = datetime.now()
+    if kwargs.get("updated_at"):
+        kwargs["updated_at"] = datetime.strptime(
+            kwargs["updated_at"], "%Y-%m-%dT%H:%M:%S.%f")
+    else:
+        obj.updated_at = datetime.now()
+    for key, val in kwargs.items():
+        if "__class__" not in key:
+            setattr(obj, key, val)
+    if not obj.id:
+        obj.id = str(uuid.uuid4())
+    return obj
+
+
+def legacy_encode(obj):
+    '''
+        Serialize obj the way BaseModel.to_dict did
+    '''
+    cp_dct = dict(obj.__dict__)
+    cp_dct['__class__'] = obj.__class__.__name__
+    cp_dct['updated_at'] = obj.updated_at.strftime("%Y-%m-%dT%H:%M:%S.%f")
+    cp_dct['created_at'] = obj.created_at.strftime("%Y-%m-%dT%H:%M:%S.%f")
+    if hasattr(obj, "_sa_instance_state"):
+        del cp_dct["_sa_instance_state"]
+    return cp_dct
+
+
+def timed(function, items):
+    '''
+        Return (microseconds per item, results) of function over items
+    '''
+    start = time.perf_counter()
+    results = [function(item) for item in items]
+    return (time.perf_counter() - start) * 1e6 / len(items), results
+
+
+def main(count):
+    '''
+        Print the time per object of each path
+    '''
+    records = [record for key, record in make_records(count)]
+    codec = model_codec.for_class(Place)
+    print("{:>8} {:>12} {:>12} {:>12}".format(
+        "path", "decode (us)", "encode (us)", "again (us)"))
+    for name, decode, encode in (("legacy", legacy_decode, legacy_encode),
+                                 ("codec", codec.decode, codec.encode)):
+        decoded, objs = timed(decode, records)
+        encoded = timed(encode, objs)[0]
+        again = timed(encode, objs)[0]
+        print("{:>8} {:>12.2f} {:>12.2f} {:>12.2f}".format(
+            name, decoded, encoded, again))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
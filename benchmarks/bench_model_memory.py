@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+'''
+    Measure the memory taken by Place instances in file storage mode,
+    next to a Place mapped by SQLAlchemy the way every model used to be.
+    Strings are shared with the parsed records and not counted, only the
+    instances themselves and the datetimes they hold. Each model is built
+    in a forked child whose resident memory growth is read from
+    /proc/self/statm, so this runs on Linux only.
+
+    Usage: python3 -m benchmarks.bench_model_memory [count]
+    The default count is 1000000.
+'''
+import gc
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.ext.declarative import declarative_base
+from benchmarks.bench_snapshot_format import make_records
+from models.place import Place
+
+
+MappedBase = declarative_base()
+records = []
+
+
+class MappedPlace(Place, MappedBase):
+    '''
+        Place mapped by SQLAlchemy, as models were in file storage mode
+    '''
+    __tablename__ = "places"
+    id = Column(String(60), primary_key=True)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+
+
+def rss():
+    '''
+        Return the resident memory of the process in bytes
+    '''
+    with open("/proc/self/statm", "r") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def measure(cls):
+    '''
+        Return the bytes taken per instance of cls built from records
+    '''
+    gc.collect()
+    before = rss()
+    objs = [cls(**record) for key, record in records]
+    return (rss() - before) / len(objs)
+
+
+def main(count):
+    '''
+        Print the memory per instance and per count instances
+    '''
+    records.extend(make_records(count))
+    print("{:>12} {:>14} {:>18}".format(
+        "model", "bytes/object", "MB per {}".format(count)))
+    for cls in (Place, MappedPlace):
+        with ProcessPoolExecutor(1, get_context("fork")) as pool:
+            per_object = pool.submit(measure, cls).result()
+        print("{:>12} {:>14.0f} {:>18.0f}".format(
+            cls.__name__, per_object, per_object * count / 1e6))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,97 @@
+#!/usr/bin/python3
+'''
+    Measure the lookups served by the indexes of migration v0001 on a
+    seeded database, with the indexes and after downgrading to schema
+    version 0 (the indexes create_all used to make), then upgrade the
+    schema back.
+
+    It writes count places, count // 10 users and count // 100 cities to
+    the database of HBNB_MYSQL_DB and leaves them there, so point it at a
+    scratch database.
+
+    Usage: HBNB_TYPE_STORAGE=db python3 -m benchmarks.bench_secondary_indexes
+           [count]
+    The default count is 100000.
+'''
+import random
+import sys
+import time
+import uuid
+from models import storage
+from models.place import Place
+from models.user import User
+
+
+def seed(count):
+    '''
+        Insert the objects looked up and return (city ids, emails)
+    '''
+    state_id = str(uuid.uuid4())
+    cities = [{"id": str(uuid.uuid4()), "state_id": state_id,
+               "name": "City {}".format(i)} for i in range(count // 100 + 1)]
+    users = [{"id": str(uuid.uuid4()), "password": "pwd",
+              "email": "user{}@{}.com".format(i, state_id)}
+             for i in range(count // 10 + 1)]
+    places = [{"city_id": cities[i % len(cities)]["id"],
+               "user_id": users[i % len(users)]["id"],
+               "name": "Place {}".format(i), "price_by_night": i % 500}
+              for i in range(count)]
+    storage.new_many([{"id": state_id, "name": "Bench"}], "State")
+    storage.new_many(cities, "City")
+    storage.new_many(users, "User")
+    for start in range(0, count, 10000):
+        storage.new_many(places[start:start + 10000], "Place")
+    return ([city["id"] for city in cities],
+            [user["email"] for user in users])
+
+
+def timed(lookup, keys):
+    '''
+        Return the milliseconds per call of lookup over keys
+    '''
+    start = time.perf_counter()
+    for key in keys:
+        lookup(key)
+    return (time.perf_counter() - start) * 1e3 / len(keys)
+
+
+def lookups(city_ids, emails):
+    '''
+        Return [(name, milliseconds per lookup)] of each indexed lookup
+    '''
+    rng = random.Random(0)
+    cities = [rng.choice(city_ids) for i in range(200)]
+    users = [rng.choice(emails) for i in range(200)]
+    return [("cheapest places of a city", timed(
+                lambda city_id: storage.query(Place).filter(
+                    city_id=city_id).order_by("price_by_night").only(
+                    "id", "price_by_night").limit(10).all(), cities)),
+            ("user by email", timed(
+                lambda email: storage.query(User).filter(
+                    email=email).only("id").first(), users))]
+
+
+def main(count):
+    '''
+        Print the time per lookup without and with the indexes
+    '''
+    if not hasattr(storage, "migrate"):
+        print("** this benchmark needs HBNB_TYPE_STORAGE=db **")
+        return
+    city_ids, emails = seed(count)
+    storage.migrate()
+    indexed = lookups(city_ids, emails)
+    storage.migrate(0)
+    try:
+        plain = lookups(city_ids, emails)
+    finally:
+        storage.migrate()
+    print("{:>28} {:>16} {:>16}".format(
+        "lookup", "v0 (ms)", "v1 (ms)"))
+    for (name, with_indexes), (same, without) in zip(indexed, plain):
+        print("{:>28} {:>16.3f} {:>16.3f}".format(name, without,
+                                                  with_indexes))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
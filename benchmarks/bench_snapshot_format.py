@@ -0,0 +1,95 @@
+#!/usr/bin/python3
+'''
+    Compare the JSON and binary snapshot formats of FileStorage:
+    file size, parse time and full reload time (parse and hydration).
+
+    Usage: python3 -m benchmarks.bench_snapshot_format [count ...]
+    The default counts are 10000 100000 1000000.
+'''
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from models.engine import json_stream, binary_snapshot
+from models.engine.file_storage import FileStorage
+
+
+def make_records(count):
+    '''
+        Yield count (key, record) pairs shaped like saved Places
+    '''
+    city_ids = [str(uuid.uuid4()) for i in range(count // 100 + 1)]
+    user_ids = [str(uuid.uuid4()) for i in range(count // 10 + 1)]
+    start = datetime(2017, 1, 1)
+    for i in range(count):
+        created = start + timedelta(seconds=i, microseconds=i % 999983)
+        record = {"id": str(uuid.uuid4()),
+                  "created_at": created.strftime(json_stream.DATETIME_FORMAT),
+                  "updated_at": created.strftime(json_stream.DATETIME_FORMAT),
+                  "city_id": city_ids[i % len(city_ids)],
+                  "user_id": user_ids[i % len(user_ids)],
+                  "name": "Place {}".format(i),
+                  "description": "A nice place to stay",
+                  "number_rooms": i % 5, "number_bathrooms": i % 3,
+                  "max_guest": i % 8, "price_by_night": 50 + i % 200,
+                  "latitude": 37.77, "longitude": -122.41,
+                  "__class__": "Place"}
+        yield "Place." + record["id"], record
+
+
+def measure(codec, path):
+    '''
+        Return (parse seconds, reload seconds) for the file at path
+    '''
+    start = time.perf_counter()
+    with codec.open_file(path, "r") as fd:
+        for item in codec.load_items(fd):
+            pass
+    parsed = time.perf_counter() - start
+
+    storage = FileStorage()
+    FileStorage._FileStorage__codec = codec
+    FileStorage._FileStorage__file_path = path
+    FileStorage._FileStorage__objects = {}
+    FileStorage._FileStorage__index = {}
+    FileStorage._FileStorage__related = {}
+    FileStorage._FileStorage__links = {}
+    FileStorage._FileStorage__fingerprints = {}
+    FileStorage._FileStorage__signature = None
+    start = time.perf_counter()
+    storage.reload()
+    reloaded = time.perf_counter() - start
+    FileStorage._FileStorage__objects = {}
+    FileStorage._FileStorage__index = {}
+    FileStorage._FileStorage__related = {}
+    FileStorage._FileStorage__links = {}
+    FileStorage._FileStorage__fingerprints = {}
+    return parsed, reloaded
+
+
+def main(counts):
+    '''
+        Print one line per format and object count
+    '''
+    tmp = tempfile.mkdtemp()
+    print("{:>9} {:>7} {:>12} {:>9} {:>10}".format(
+        "objects", "format", "size (MB)", "parse (s)", "reload (s)"))
+    for count in counts:
+        for codec in (json_stream, binary_snapshot):
+            path = os.path.join(tmp, "file" + codec.EXTENSION)
+            with codec.open_file(path, "w") as fd:
+                for item in codec.dump_items(fd, make_records(count)):
+                    pass
+            size = os.path.getsize(path) / 1e6
+            parsed, reloaded = measure(codec, path)
+            print("{:>9} {:>7} {:>12.1f} {:>9.2f} {:>10.2f}".format(
+                count, codec.EXTENSION[1:], size, parsed, reloaded))
+            os.remove(path)
+    shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000])
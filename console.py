@@ -5,6 +5,7 @@ Cmd or Shell for HBH
 """
 
 import cmd
+import json
 from models.base_model import BaseModel
 from models.user import User
 from models.state import State
@@ -75,6 +76,39 @@ class HBNBCommand(cmd.Cmd):
         new_instance.save()
         print(new_instance.id)
 
+    def do_bulk_create(self, arg):
+        """
+        Create and save at once the instances of a class described by a
+        JSON file holding a list of attribute dicts, and print their ids.
+        Usage: bulk_create <Class name> <file>
+        """
+        args = arg.split()
+        if not args:
+            print("** class name missing **")
+            return
+        if args[0] not in globals():
+            print("** class doesn't exist **")
+            return
+        if len(args) < 2:
+            print("** file missing **")
+            return
+        try:
+            with open(args[1], "r") as f:
+                items = json.load(f)
+        except (OSError, ValueError):
+            print("** file unreadable **")
+            return
+        if not isinstance(items, list):
+            print("** file must hold a list **")
+            return
+        try:
+            objs = storage.new_many(items, args[0])
+        except ValueError as error:
+            print("** {} **".format(error))
+            return
+        for obj in objs:
+            print(obj.id)
+
     def do_show(self, arg):
         """
         Show an instance based on the class name and id.
@@ -113,7 +147,7 @@ class HBNBCommand(cmd.Cmd):
         if key not in storage.all():
             print("** no instance found **")
             return
-        del storage.all()[key]
+        storage.delete(storage.all()[key])
         storage.save()
 
     def do_all(self, arg):
@@ -3,23 +3,55 @@
     This module defines the BaseModel class
 '''
 from os import getenv
+import json
 import uuid
+import threading
+import weakref
 from datetime import datetime
 import models
-from sqlalchemy import Column, String, Integer, DateTime
+from models.engine import model_codec
+from sqlalchemy import Column, String, Integer, DateTime, MetaData
 from sqlalchemy.ext.declarative import declarative_base
 
 
-Base = declarative_base()
+if getenv("HBNB_TYPE_STORAGE", "fs") == "db":
+    Base = declarative_base()
+else:
+    class Base:
+        '''
+            Stand-in for the declarative base in file storage mode.
+            Models are not mapped, so an instance holds its own attributes
+            only, without the SQLAlchemy instance state and instrumented
+            attributes (about three quarters of its memory when mapped).
+        '''
+        metadata = MetaData()
 
 
 class BaseModel:
     '''
         Base class for other classes to be used for the duration.
+        Public attributes assigned after __init__ are recorded as dirty
+        until the storage engine flushes them (see pop_dirty).
+        The _stamps slot holds the timestamps cached by model_codec.
+
+        Unmapped (file storage) instances keep the result of to_dict, and
+        of to_json once asked, in their _cache slot until an attribute is
+        assigned. Changes made in place, such as appending to a list
+        attribute, must be followed by an assignment to be seen.
     '''
-    id = Column(String(60), nullable=False, primary_key=True)
-    created_at = Column(DateTime, default=datetime.utcnow(), nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow(), nullable=False)
+    __slots__ = ("__dict__", "__weakref__", "_stamps", "_cache")
+    if getenv("HBNB_TYPE_STORAGE", "fs") == "db":
+        id = Column(String(60), nullable=False, primary_key=True)
+        created_at = Column(DateTime, default=datetime.utcnow(),
+                            nullable=False)
+        updated_at = Column(DateTime, default=datetime.utcnow(),
+                            nullable=False)
+    else:
+        id = None
+    __dirty = weakref.WeakKeyDictionary()
+    __dirty_lock = threading.Lock()
+    __cache_hits = 0
+    __cache_misses = 0
 
     def __init__(self, *args, **kwargs):
         '''
@@ -31,13 +63,13 @@ class BaseModel:
             self.updated_at = datetime.now()
         else:
             if kwargs.get("created_at"):
-                kwargs["created_at"] = datetime.strptime(
-                    kwargs["created_at"], "%Y-%m-%dT%H:%M:%S.%f")
+                kwargs["created_at"] = model_codec.parse_datetime(
+                    kwargs["created_at"])
             else:
                 self.created_at = datetime.now()
-            if kwargs.get("created_at"):
-                kwargs["updated_at"] = datetime.strptime(
-                    kwargs["updated_at"], "%Y-%m-%dT%H:%M:%S.%f")
+            if kwargs.get("updated_at"):
+                kwargs["updated_at"] = model_codec.parse_datetime(
+                    kwargs["updated_at"])
             else:
                 self.updated_at = datetime.now()
             for key, val in kwargs.items():
@@ -45,6 +77,54 @@ class BaseModel:
                     setattr(self, key, val)
             if not self.id:
                 self.id = str(uuid.uuid4())
+        with BaseModel.__dirty_lock:
+            BaseModel.__dirty.pop(self, None)
+
+    def __setattr__(self, name, value):
+        '''
+            Set an attribute and record public ones as dirty
+        '''
+        super().__setattr__(name, value)
+        if name[0] != "_":
+            object.__setattr__(self, "_cache", None)
+            with BaseModel.__dirty_lock:
+                fields = BaseModel.__dirty.get(self)
+                if fields is None:
+                    fields = BaseModel.__dirty[self] = set()
+                fields.add(name)
+
+    @staticmethod
+    def cache_stats():
+        '''
+            Return the hits and misses of the to_dict cache
+        '''
+        return {"hits": BaseModel.__cache_hits,
+                "misses": BaseModel.__cache_misses}
+
+    def dirty_fields(self):
+        '''
+            Return the attributes modified since the last flush
+        '''
+        with BaseModel.__dirty_lock:
+            return set(BaseModel.__dirty.get(self, ()))
+
+    @staticmethod
+    def dirty_count():
+        '''
+            Return the number of instances modified since the last flush
+        '''
+        return len(BaseModel.__dirty)
+
+    @staticmethod
+    def pop_dirty():
+        '''
+            Return {instance: modified attributes} for every instance
+            modified since the last call, and start tracking afresh
+        '''
+        with BaseModel.__dirty_lock:
+            dirty = dict(BaseModel.__dirty)
+            BaseModel.__dirty.clear()
+        return dirty
 
     def __str__(self):
         '''
@@ -68,17 +148,63 @@ class BaseModel:
         models.storage.new(self)
         models.storage.save()
 
+    @classmethod
+    def bulk_create(cls, items):
+        '''
+            Create and save many instances of the class at once from
+            dicts of attributes, see storage.new_many
+        '''
+        return models.storage.new_many(items, cls)
+
     def to_dict(self):
         '''
             Return dictionary representation of BaseModel class.
         '''
-        cp_dct = dict(self.__dict__)
-        cp_dct['__class__'] = self.__class__.__name__
-        cp_dct['updated_at'] = self.updated_at.strftime("%Y-%m-%dT%H:%M:%S.%f")
-        cp_dct['created_at'] = self.created_at.strftime("%Y-%m-%dT%H:%M:%S.%f")
-        if hasattr(self, "_sa_instance_state"):
-            del cp_dct["_sa_instance_state"]
-        return (cp_dct)
+        cache = self.__cached()
+        if cache is None:
+            return model_codec.encode(self)
+        return dict(cache[0])
+
+    def to_json(self):
+        '''
+            Return the to_dict record as compact JSON bytes with sorted
+            keys, as jsonify writes it
+        '''
+        cache = self.__cached()
+        if cache is None:
+            return self.__dump(model_codec.encode(self))
+        if cache[1] is None:
+            cache[1] = self.__dump(cache[0])
+        return cache[1]
+
+    @staticmethod
+    def __dump(record):
+        '''
+            Encode a record the way jsonify does outside debug mode
+        '''
+        return json.dumps(record, sort_keys=True,
+                          separators=(",", ":")).encode()
+
+    def __cached(self):
+        '''
+            Return the [record, JSON bytes] cache of the instance,
+            encoding the record on a miss, or None for mapped instances
+            whose attributes SQLAlchemy may load behind __setattr__
+        '''
+        try:
+            cache = self._cache
+        except AttributeError:
+            cache = None
+        if cache is not None:
+            BaseModel.__cache_hits += 1
+            return cache
+        codec = model_codec.for_class(type(self))
+        if codec.mapped:
+            return None
+        BaseModel.__cache_misses += 1
+        cache = [codec.encode(self), None]
+        object.__setattr__(self, "_cache", cache)
+        return cache
 
     def delete(self):
         '''
@@ -3,7 +3,7 @@
     Define the class City.
 '''
 from os import getenv
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from models.base_model import BaseModel, Base
 import models
@@ -18,6 +18,8 @@ class City(BaseModel, Base):
     if getenv("HBNB_TYPE_STORAGE") == "db":
         name = Column(String(128), nullable=False)
         state_id = Column(String(60), ForeignKey('states.id'), nullable=False)
+        __table_args__ = (Index("ix_cities_state_id_name", "state_id",
+                                "name"),)
         places = relationship("Place", backref="cities",
                               cascade="all, delete, delete-orphan")
     else:
@@ -0,0 +1,230 @@
+#!/usr/bin/python3
+'''
+    Compact binary snapshot format for FileStorage.
+
+    A snapshot starts with the MAGIC bytes and a format VERSION, followed
+    by blocks of up to BLOCK_SIZE records. Each block is a length prefixed
+    compact UTF-8 JSON array holding the strings and record shapes first
+    seen in the block and the records themselves:
+
+        [new strings, new shapes, [[shape id, key, value, ...], ...]]
+
+    Every string is stored once in the snapshot and referenced by its
+    position in the string table afterwards. A shape lists the field
+    names of a record with the type code of each value: "s" for a string
+    table reference, "d" for a datetime stored as microseconds since
+    0001-01-01 and "v" for any other JSON value. The key of a record is
+    None when it is <__class__>.<id>.
+
+    The created_at and updated_at strings of model_codec.DATETIME_FIELDS,
+    in the format BaseModel.to_dict writes, are stored as datetimes and
+    read back as datetime objects, which json_stream writes back in that
+    same format; every other string is kept as it is, so converting
+    between file.json and a snapshot is lossless.
+
+    Version 1 snapshots held marshal payloads, whose format may change
+    between Python versions; they are still read, and written again as
+    version 2 by the next save.
+
+    Usage: python3 -m models.engine.binary_snapshot to-json|from-json
+           <source> <destination>
+'''
+import json
+import marshal
+import re
+import struct
+import sys
+from datetime import datetime, timedelta
+from models.engine import json_stream
+from models.engine.model_codec import DATETIME_FIELDS
+
+
+EXTENSION = ".bin"
+MAGIC = b"HBNBSNAP"
+VERSION = 2
+BLOCK_SIZE = 1024
+EPOCH = datetime(1, 1, 1)
+DATETIME = re.compile(r'[1-9]\d{3}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{6}\Z')
+HEADER = struct.Struct("<8sH")
+LENGTH = struct.Struct("<I")
+
+
+def open_file(path, mode):
+    '''
+        Open a snapshot file for reading ("r") or writing ("w")
+    '''
+    return open(path, mode + "b")
+
+
+def dump_items(fd, items):
+    '''
+        Write a snapshot to fd from (key, record) pairs, one block of
+        records at a time.
+        Arguments:
+            fd: file object opened for writing bytes
+            items: iterable of (key, record)
+        Yields the stored form of each record once it is encoded, see
+        _stored_form.
+    '''
+    strings = {}
+    shapes = {}
+    new_strings = []
+    new_shapes = []
+    records = []
+
+    def ref(string):
+        '''
+            Return the string table index of string
+        '''
+        index = strings.get(string)
+        if index is None:
+            index = strings[string] = len(strings)
+            new_strings.append(string)
+        return index
+
+    fd.write(HEADER.pack(MAGIC, VERSION))
+    for key, record in items:
+        fields = []
+        values = []
+        plain = []
+        for name, value in record.items():
+            if name not in DATETIME_FIELDS:
+                if type(value) is datetime:
+                    value = json_stream.default(value)
+            elif type(value) is str:
+                value = _parse_datetime(value)
+            if type(value) is datetime:
+                code = "d"
+                value = (value - EPOCH) // timedelta(microseconds=1)
+                plain.append(value)
+            elif type(value) is str:
+                plain.append(value)
+                code, value = "s", ref(value)
+            else:
+                code = "v"
+                plain.append(value)
+            fields.append((ref(name), code))
+            values.append(value)
+        shape = tuple(fields)
+        shape_id = shapes.get(shape)
+        if shape_id is None:
+            shape_id = shapes[shape] = len(shapes)
+            new_shapes.append(shape)
+        stored_key = key
+        if key == "{}.{}".format(record.get("__class__"), record.get("id")):
+            stored_key = None
+        records.append((shape_id, stored_key) + tuple(values))
+        yield key, _stored_form(record, plain)
+        if len(records) == BLOCK_SIZE:
+            _write_block(fd, new_strings, new_shapes, records)
+            new_strings, new_shapes, records = [], [], []
+    if records or new_strings:
+        _write_block(fd, new_strings, new_shapes, records)
+
+
+def load_items(fd, fingerprints=None):
+    '''
+        Read the snapshot stored in fd and yield its (key, record) pairs,
+        decoding one block at a time.
+        Arguments:
+            fd: file object opened for reading bytes
+            fingerprints: dict in which the hash of the stored form of
+                          each record is stored under its key before the
+                          record is yielded
+    '''
+    magic, version = HEADER.unpack(fd.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError("Not a snapshot file")
+    if version not in (1, VERSION):
+        raise ValueError("Unsupported snapshot version {}".format(version))
+    strings = []
+    shapes = []
+    while True:
+        length = fd.read(LENGTH.size)
+        if not length:
+            return
+        payload = fd.read(LENGTH.unpack(length)[0])
+        if version == 1:
+            new_strings, new_shapes, records = marshal.loads(payload)
+        else:
+            new_strings, new_shapes, records = json.loads(payload)
+        strings.extend(new_strings)
+        for shape in new_shapes:
+            shapes.append(tuple((strings[name], code)
+                                for name, code in shape))
+        for values in records:
+            record = {}
+            plain = []
+            for (name, code), value in zip(shapes[values[0]], values[2:]):
+                if code == "s":
+                    value = strings[value]
+                plain.append(value)
+                if code == "d":
+                    value = EPOCH + timedelta(microseconds=value)
+                record[name] = value
+            key = values[1]
+            if key is None:
+                key = record["__class__"] + "." + record["id"]
+            if fingerprints is not None:
+                fingerprints[key] = hash(_stored_form(record, plain))
+            yield key, record
+
+
+def _stored_form(record, plain):
+    '''
+        Return the bytes identifying a record as stored: its field names
+        and its values, with strings resolved and datetimes in
+        microseconds. Marshal version 0 writes no interning or reference
+        flags, so equal records always give equal bytes.
+    '''
+    return marshal.dumps((tuple(record), plain), 0)
+
+
+def _write_block(fd, new_strings, new_shapes, records):
+    '''
+        Write one length prefixed block
+    '''
+    payload = json.dumps([new_strings, new_shapes, records],
+                         ensure_ascii=False,
+                         separators=(",", ":")).encode("UTF8")
+    fd.write(LENGTH.pack(len(payload)))
+    fd.write(payload)
+
+
+def _parse_datetime(value):
+    '''
+        Return value as a datetime when it is written in the
+        BaseModel.to_dict format, value itself otherwise
+    '''
+    if len(value) != 26 or not DATETIME.match(value):
+        return value
+    try:
+        return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                        int(value[11:13]), int(value[14:16]),
+                        int(value[17:19]), int(value[20:26]))
+    except ValueError:
+        return value
+
+
+def convert(src, dst, src_codec, dst_codec):
+    '''
+        Stream every record of the src file into the dst file
+    '''
+    with src_codec.open_file(src, "r") as fd_in:
+        with dst_codec.open_file(dst, "w") as fd_out:
+            for key, text in dst_codec.dump_items(
+                    fd_out, src_codec.load_items(fd_in)):
+                pass
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ("to-json", "from-json"):
+        print("Usage: python3 -m models.engine.binary_snapshot "
+              "to-json|from-json <source> <destination>")
+        sys.exit(1)
+    if sys.argv[1] == "to-json":
+        convert(sys.argv[2], sys.argv[3], sys.modules[__name__],
+                json_stream)
+    else:
+        convert(sys.argv[2], sys.argv[3], json_stream,
+                sys.modules[__name__])
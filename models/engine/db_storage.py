@@ -2,10 +2,22 @@
 '''
     Define class DatabaseStorage
 '''
+import copy
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
 from os import getenv
-from sqlalchemy import create_engine, MetaData
-from sqlalchemy.orm import sessionmaker, scoped_session
+from decimal import Decimal
+from sqlalchemy import create_engine, MetaData, func, select, tuple_
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
+from sqlalchemy.orm import (Session, sessionmaker, scoped_session,
+                            selectinload, joinedload,
+                            make_transient_to_detached)
+from sqlalchemy.orm.loading import merge_frozen_result
 import models
+from models.engine import migrations, model_codec, pool_metrics
+from models.engine.query import Query
 from models.state import State
 from models.city import City
 from models.base_model import Base
@@ -17,6 +29,16 @@ class DBStorage:
     '''
     __engine = None
     __session = None
+    __cache = OrderedDict()
+    __cache_lock = threading.Lock()
+    __cache_hits = 0
+    __cache_misses = 0
+    __results = OrderedDict()
+    __result_hits = 0
+    __result_misses = 0
+    __result_evictions = 0
+    __versions = {}
+    __local = threading.local()
 
     def __init__(self):
         '''
@@ -27,8 +49,21 @@ class DBStorage:
         host = getenv("HBNB_MYSQL_HOST")
         db = getenv("HBNB_MYSQL_DB")
         envv = getenv("HBNB_ENV", "none")
-        self.__engine = create_engine('mysql+mysqldb://{}:{}@{}/{}'.format(
-            user, pwd, host, db), pool_pre_ping=True)
+        DBStorage.__cache_ttl = float(getenv("HBNB_DB_CACHE_TTL", "5"))
+        DBStorage.__cache_size = int(getenv("HBNB_DB_CACHE_SIZE", "1024"))
+        DBStorage.__result_size = int(getenv("HBNB_DB_RESULT_CACHE", "0"))
+        DBStorage.__result_ttl = float(getenv("HBNB_DB_RESULT_CACHE_TTL",
+                                              "60"))
+        url = getenv("HBNB_DB_URL") or 'mysql+mysqldb://{}:{}@{}/{}'.format(
+            user, pwd, host, db)
+        self.__engine = create_engine(
+            url, pool_pre_ping=True,
+            poolclass=pool_metrics.MeteredQueuePool,
+            pool_size=int(getenv("HBNB_MYSQL_POOL_SIZE", "5")),
+            max_overflow=int(getenv("HBNB_MYSQL_MAX_OVERFLOW", "10")),
+            pool_timeout=float(getenv("HBNB_MYSQL_POOL_TIMEOUT", "30")),
+            pool_recycle=int(getenv("HBNB_MYSQL_POOL_RECYCLE", "3600")))
+        self.__pool_metrics = pool_metrics.instrument(self.__engine)
         if envv == 'test':
             Base.metadata.drop_all(self.__engine)
 
@@ -39,81 +74,482 @@ class DBStorage:
         db_dict = {}
 
         if cls is not None and cls != '':
-            objs = self.__session.query(models.classes[cls]).all()
+            if isinstance(cls, str):
+                cls = models.classes[cls]
+            classes = [cls]
+        else:
+            classes = [v for k, v in models.classes.items()
+                       if k != "BaseModel"]
+        for cls in classes:
+            stmt = select(cls)
+            objs = self.__remember(("all", cls.__name__), [cls.__name__],
+                                   stmt=stmt).scalars()
             for obj in objs:
                 key = "{}.{}".format(obj.__class__.__name__, obj.id)
                 db_dict[key] = obj
-            return db_dict
-        else:
-            for k, v in models.classes.items():
-                if k != "BaseModel":
-                    objs = self.__session.query(v).all()
-                    if len(objs) > 0:
-                        for obj in objs:
-                            key = "{}.{}".format(obj.__class__.__name__,
-                                                 obj.id)
-                            db_dict[key] = obj
-            return db_dict
+        return db_dict
 
     def new(self, obj):
         '''
             Add object to current database session
         '''
+        self.__uncache([obj])
+        self.__touched().add(type(obj).__name__)
         self.__session.add(obj)
 
+    def new_many(self, objs, cls=None, save=True):
+        '''
+            Insert many objects with one executemany per table, parents
+            first, and commit
+            Arguments:
+                objs: iterable of instances or of dicts of attributes
+                cls (str or class): class of the dicts, see
+                      model_codec.build_many
+                save (bool): False to leave the commit to the caller
+            Returns the list of inserted instances, attached to the
+            session as if loaded from their rows. Raises ValueError, after
+            rolling the session back, when the database rejects a row.
+        '''
+        mapped = {name: model for name, model in models.classes.items()
+                  if hasattr(model, "__table__")}
+        objs = model_codec.build_many(objs, mapped, cls)
+        tables = {}
+        for obj in objs:
+            tables.setdefault(type(obj).__table__, []).append(obj)
+        for table in Base.metadata.sorted_tables:
+            if table not in tables:
+                continue
+            defaults = {column.key: column.default.arg
+                        for column in table.columns
+                        if column.default is not None and
+                        column.default.is_scalar}
+            rows = []
+            for obj in tables[table]:
+                attrs = obj.__dict__
+                row = {}
+                for column in table.columns:
+                    value = attrs.get(column.key)
+                    if value is None:
+                        value = defaults.get(column.key)
+                    row[column.key] = value
+                rows.append(row)
+            try:
+                self.__session.execute(table.insert(), rows)
+            except IntegrityError as error:
+                self.__session.rollback()
+                self.__touched().clear()
+                raise ValueError(str(error.orig))
+        for obj in objs:
+            make_transient_to_detached(obj)
+            self.__session.add(obj)
+        names = {type(obj).__name__ for obj in objs}
+        if save:
+            self.__session.commit()
+            self.__bump(names | self.__touched())
+            self.__touched().clear()
+        else:
+            self.__touched().update(names)
+        return objs
+
+    def query(self, cls):
+        '''
+            Return a Query over the objects of cls, see
+            models.engine.query
+            Args:
+                cls (str or class): class queried
+        '''
+        if isinstance(cls, str):
+            cls = models.classes[cls]
+        return Query(cls, self.__plan)
+
+    def __plan(self, query):
+        '''
+            Compile query into a single SELECT statement, of only the
+            projected columns when the query has fields
+            Returns (SQL text, function returning the results).
+        '''
+        cls = query.cls
+        if query.aggregates is not None:
+            return self.__plan_aggregate(query)
+        key = ("query", cls.__name__, tuple(sorted(query.filters.items())),
+               query.order, query.max_results, query.seek, query.fields,
+               tuple(sorted(query.loads.items())))
+        if query.fields is None:
+            stmt = select(cls)
+        else:
+            columns = [getattr(cls, field) for field in query.fields
+                       if field in cls.__table__.columns]
+            stmt = select(*(columns or [cls.id]))
+        stmt = stmt.filter_by(**query.filters)
+        if query.seek is not None:
+            columns = tuple_(*(getattr(cls, field.lstrip("-"))
+                               for field in query.order))
+            if query.order[0].startswith("-"):
+                stmt = stmt.where(columns < tuple_(*query.seek))
+            else:
+                stmt = stmt.where(columns > tuple_(*query.seek))
+        for field in query.order:
+            if field.startswith("-"):
+                stmt = stmt.order_by(getattr(cls, field[1:]).desc())
+            else:
+                stmt = stmt.order_by(getattr(cls, field))
+        if query.max_results is not None:
+            stmt = stmt.limit(query.max_results)
+        if query.fields is None:
+            names = [cls.__name__]
+            for path, strategy in query.loads.items():
+                option, related = self.__loader(cls, path, strategy)
+                stmt = stmt.options(option)
+                names.extend(related)
+            return (str(stmt.compile(self.__engine)),
+                    lambda: list(self.__remember(key, names, stmt=stmt)
+                                 .scalars().unique()))
+        codec = model_codec.for_class(cls)
+        return (str(stmt.compile(self.__engine)),
+                lambda: self.__remember(key, [cls.__name__], lambda: [
+                    codec.project(row, query.fields) for row in
+                    self.__session.execute(stmt).mappings()]))
+
+    @staticmethod
+    def __loader(cls, path, strategy):
+        '''
+            Return (loader option, names of the classes loaded) fetching
+            the dotted relationship path of cls with strategy, "selectin"
+            or "joined"
+        '''
+        load = selectinload if strategy == "selectin" else joinedload
+        option = None
+        names = []
+        for name in path.split("."):
+            attr = getattr(cls, name)
+            option = load(attr) if option is None else getattr(
+                option, load.__name__)(attr)
+            cls = attr.property.mapper.class_
+            names.append(cls.__name__)
+        return option, names
+
+    def count_queries(self, max_queries=None):
+        '''
+            Return a context manager counting the statements the current
+            thread runs while it is open, see pool_metrics.QueryCounter
+        '''
+        return pool_metrics.QueryCounter(self.__engine, max_queries)
+
+    def __plan_aggregate(self, query):
+        '''
+            Compile the aggregates of query into one SELECT ... GROUP BY
+            Returns (SQL text, function returning the results).
+        '''
+        cls = query.cls
+        names = list(query.aggregates)
+        columns = [getattr(func, function)(getattr(cls, attr)).label(name)
+                   for name, (function, attr) in query.aggregates.items()]
+        if query.group:
+            group = getattr(cls, query.group)
+            stmt = select(group, *columns).group_by(group)
+        else:
+            stmt = select(*columns).select_from(cls)
+        stmt = stmt.where(*(getattr(cls, attr) == value
+                            for attr, value in query.filters.items()))
+        key = ("aggregate", cls.__name__,
+               tuple(sorted(query.filters.items())),
+               tuple(query.aggregates.items()), query.group)
+
+        def run():
+            results = {}
+            for row in self.__session.execute(stmt):
+                values = [float(value) if isinstance(value, Decimal)
+                          else value for value in row]
+                if not query.group:
+                    return dict(zip(names, values))
+                results[values[0]] = dict(zip(names, values[1:]))
+            return results
+        return (str(stmt.compile(self.__engine)),
+                lambda: self.__remember(key, [cls.__name__], run))
+
     def save(self):
         '''
             Commit all changes of current database session
         '''
-        self.__session.commit()
+        session = self.__session
+        changed = list(chain(session.new, session.dirty, session.deleted))
+        self.__uncache(changed)
+        session.commit()
+        touched = self.__touched()
+        self.__bump(touched.union(type(obj).__name__ for obj in changed))
+        touched.clear()
 
     def delete(self, obj=None):
         '''
             Delete from current database session
         '''
         if obj is not None:
+            self.__uncache([obj])
+            self.__touched().add(type(obj).__name__)
             self.__session.delete(obj)
 
     def reload(self):
         '''
-            Commit all changes of current database session
+            Create the tables and the session registry; each thread
+            gets its own session from it on first use
         '''
-        self.__session = Base.metadata.create_all(self.__engine)
+        Base.metadata.create_all(self.__engine)
         factory = sessionmaker(bind=self.__engine, expire_on_commit=False)
-        Session = scoped_session(factory)
-        self.__session = Session()
+        self.__session = scoped_session(factory)
 
     def close(self):
         '''
-            Remove private session attribute
+            Close the session of the current thread and return its
+            connection to the pool
+        '''
+        self.__session.remove()
+        self.__touched().clear()
+
+    def migrate(self, target=None):
+        '''
+            Bring the schema to version target, the latest when None,
+            see models.engine.migrations
+            Returns [(version, "upgrade" or "downgrade")] of the
+            migrations run.
         '''
-        self.__session.close()
+        return migrations.migrate(self.__engine, target)
+
+    def schema_version(self):
+        '''
+            Return the schema version of the database
+        '''
+        return migrations.current_version(self.__engine)
+
+    def pool_stats(self):
+        '''
+            Return the connection pool metrics, see
+            models.engine.pool_metrics
+        '''
+        return self.__pool_metrics.snapshot(self.__engine.pool)
 
     def get(self, cls, id):
         '''
-        gets an object
+        gets an object by primary key, through the session identity map
+        and a per-process cache of detached copies of recently read
+        objects kept for HBNB_DB_CACHE_TTL seconds; new, delete and save
+        drop the objects they touch from the cache
         Args:
-            cls (str): class name
+            cls (str or class): class name
             id (str): object ID
         Returns:
             an object based on class name and its ID
         '''
-        obj_dict = models.storage.all(cls)
-        for k, v in obj_dict.items():
-            matchstring = cls + '.' + id
-            if k == matchstring:
-                return v
+        if isinstance(cls, str):
+            cls = models.classes.get(cls)
+        if cls is None or not hasattr(cls, "__table__") or id is None:
+            return None
+        key = cls.__name__ + "." + id
+        now = time.monotonic()
+        if DBStorage.__cache_ttl > 0:
+            with DBStorage.__cache_lock:
+                entry = DBStorage.__cache.get(key)
+                if entry is not None and entry[0] > now:
+                    DBStorage.__cache.move_to_end(key)
+                    DBStorage.__cache_hits += 1
+                else:
+                    entry = None
+                    DBStorage.__cache_misses += 1
+            if entry is not None:
+                try:
+                    return self.__session.merge(entry[1], load=False)
+                except InvalidRequestError:
+                    self.__uncache([entry[1]])
+        obj = self.__session.get(cls, id)
+        if obj is not None and DBStorage.__cache_ttl > 0:
+            try:
+                with Session() as scratch:
+                    detached = scratch.merge(obj, load=False)
+            except InvalidRequestError:
+                return obj
+            with DBStorage.__cache_lock:
+                expires = now + DBStorage.__cache_ttl
+                DBStorage.__cache[key] = (expires, detached)
+                DBStorage.__cache.move_to_end(key)
+                while len(DBStorage.__cache) > DBStorage.__cache_size:
+                    DBStorage.__cache.popitem(last=False)
+        return obj
+
+    @staticmethod
+    def __uncache(objs):
+        '''
+            Drop objs from the get cache
+        '''
+        with DBStorage.__cache_lock:
+            for obj in objs:
+                DBStorage.__cache.pop(
+                    "{}.{}".format(type(obj).__name__, obj.id), None)
+
+    @staticmethod
+    def cache_stats():
+        '''
+            Return the hits, misses, hit ratio and size of the get cache
+        '''
+        with DBStorage.__cache_lock:
+            hits = DBStorage.__cache_hits
+            lookups = hits + DBStorage.__cache_misses
+            return {"hits": hits, "misses": DBStorage.__cache_misses,
+                    "ratio": hits / lookups if lookups else 0.0,
+                    "size": len(DBStorage.__cache)}
+
+    def __remember(self, key, names, run=None, stmt=None):
+        '''
+            Return the result of a read of the classes of names, from the
+            result cache when key was stored since the last save that
+            touched any of them, else from run(). The cache holds
+            HBNB_DB_RESULT_CACHE results, least recently used evicted
+            first, for at most HBNB_DB_RESULT_CACHE_TTL seconds; it is
+            skipped while the session of the thread has unsaved changes.
+            Entity reads pass their statement instead of run: their
+            Result is cached frozen and merged into the session on a
+            hit; the cache keeps detached copies, so each thread gets
+            its own instances. Other results are copied, callers may
+            change them.
+        '''
+        session = self.__session
+        touched = self.__touched()
+        touched.update(type(obj).__name__ for obj in
+                       chain(session.new, session.dirty, session.deleted))
+        try:
+            hash(key)
+        except TypeError:
+            key = None
+        if DBStorage.__result_size <= 0 or key is None or touched:
+            return session.execute(stmt) if stmt is not None else run()
+        now = time.monotonic()
+        with DBStorage.__cache_lock:
+            versions = tuple(DBStorage.__versions.get(name, 0)
+                             for name in names)
+            entry = DBStorage.__results.get(key)
+            if entry is not None and entry[0] > now and \
+                    entry[1] == versions:
+                DBStorage.__results.move_to_end(key)
+                DBStorage.__result_hits += 1
+            else:
+                entry = None
+                DBStorage.__result_misses += 1
+        if entry is not None:
+            if stmt is not None:
+                return merge_frozen_result(session(), stmt, entry[2],
+                                           load=False)()
+            return copy.deepcopy(entry[2])
+        if stmt is not None:
+            frozen = session.execute(stmt).freeze()
+            value = frozen()
+            with Session() as scratch:
+                stored = merge_frozen_result(scratch, stmt, frozen,
+                                             load=False)
+        else:
+            value = run()
+            stored = copy.deepcopy(value)
+        with DBStorage.__cache_lock:
+            DBStorage.__results[key] = (now + DBStorage.__result_ttl,
+                                        versions, stored)
+            DBStorage.__results.move_to_end(key)
+            while len(DBStorage.__results) > DBStorage.__result_size:
+                DBStorage.__results.popitem(last=False)
+                DBStorage.__result_evictions += 1
+        return value
 
-        return None
+    @staticmethod
+    def __touched():
+        '''
+            Return the set of the names of the classes changed by the
+            current thread since its last save
+        '''
+        touched = getattr(DBStorage.__local, "touched", None)
+        if touched is None:
+            touched = DBStorage.__local.touched = set()
+        return touched
+
+    @staticmethod
+    def __bump(names):
+        '''
+            Invalidate the cached results of the classes of names and of
+            the classes their deletes cascade to
+        '''
+        names = set(names)
+        pending = list(names)
+        while pending:
+            mapper = getattr(models.classes.get(pending.pop()),
+                             "__mapper__", None)
+            for relationship in mapper.relationships if mapper else ():
+                name = relationship.mapper.class_.__name__
+                if relationship.cascade.delete and name not in names:
+                    names.add(name)
+                    pending.append(name)
+        with DBStorage.__cache_lock:
+            for name in names:
+                DBStorage.__versions[name] = \
+                    DBStorage.__versions.get(name, 0) + 1
+
+    @staticmethod
+    def result_cache_stats():
+        '''
+            Return the hits, misses, hit ratio, evictions and size of the
+            result cache
+        '''
+        with DBStorage.__cache_lock:
+            hits = DBStorage.__result_hits
+            lookups = hits + DBStorage.__result_misses
+            return {"hits": hits, "misses": DBStorage.__result_misses,
+                    "ratio": hits / lookups if lookups else 0.0,
+                    "evictions": DBStorage.__result_evictions,
+                    "size": len(DBStorage.__results)}
 
     def count(self, cls=None):
         '''
         counts number of objects of a class (if given)
         Args:
-            cls (str): class name
+            cls (str or class): class name
         Returns:
             number of objects in class, if no class name given
             return total number of objects in database
         '''
-        obj_dict = models.storage.all(cls)
-        return len(obj_dict)
+        if cls is None or cls == '':
+            return sum(self.counts(name for name in models.classes
+                                   if name != "BaseModel").values())
+        return self.counts([cls])[
+            cls if isinstance(cls, str) else cls.__name__]
+
+    def existing_ids(self, cls, ids):
+        '''
+        finds which of the given ids belong to objects of a class, with
+        one SELECT ... WHERE id IN
+        Args:
+            cls (str or class): class name
+            ids: iterable of object IDs
+        Returns:
+            the set of the ids found
+        '''
+        if isinstance(cls, str):
+            cls = models.classes[cls]
+        ids = list(ids)
+        if not ids:
+            return set()
+        return set(self.__session.scalars(
+            select(cls.id).where(cls.id.in_(ids))))
+
+    def counts(self, classes):
+        '''
+        counts the objects of several classes in one SELECT COUNT(*)
+        per table, sent as a single statement
+        Args:
+            classes: iterable of class names or classes
+        Returns:
+            {class name: number of objects}
+        '''
+        classes = [models.classes[cls] if isinstance(cls, str) else cls
+                   for cls in classes]
+        names = [cls.__name__ for cls in classes]
+        stmt = select(*(select(func.count()).select_from(cls)
+                        .scalar_subquery().label(cls.__name__)
+                        for cls in classes))
+        row = self.__remember(("counts",) + tuple(names), names,
+                              lambda: tuple(self.__session.execute(stmt)
+                                            .one()))
+        return dict(zip(names, row))
@@ -2,32 +2,162 @@
 '''
     Define class FileStorage
 '''
+import atexit
+import fcntl
 import json
+import logging
+import os
+import threading
+import zlib
+from os import getenv
+from itertools import chain
+from types import MappingProxyType
+from functools import partial
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 import models
+from models.engine import json_stream, binary_snapshot, model_codec
+from models.engine.query import Query, aggregate, matches, select
 
 
 class FileStorage:
     '''
         Serializes instances to JSON file and deserializes to JSON file.
+
+        With HBNB_FS_JOURNAL=1 save() appends the mutations made since the
+        last save to a journal next to the snapshot instead of rewriting
+        the whole file. reload() replays snapshot plus journal, and the
+        journal is folded back into a fresh snapshot once it grows past
+        HBNB_FS_JOURNAL_MAX bytes.
+
+        Objects are also indexed per class as {class name: {id: obj}} so
+        all(cls), get() and count() never walk the whole store, and
+        reverse indexes from parent id to children back related() for
+        the foreign keys listed in __relations.
+
+        reload() remembers the mtime, size and inode of the files it read
+        and does nothing while they are unchanged. When they did change
+        only the records whose content differs are re-hydrated, and the
+        generation counter is bumped.
+
+        With HBNB_FS_LAZY=1 reload() keeps the parsed records as they are
+        and only builds the model instance when all(), get() or related()
+        first hands it out. Untouched records are written back by save()
+        without ever being hydrated.
+
+        The snapshot is written and parsed one record at a time through
+        json_stream, so save() and reload() never hold a second copy of
+        the whole store.
+
+        With HBNB_FS_SHARD_DIR set, objects live in that directory with
+        one file per class, split into HBNB_FS_PARTITIONS files by a hash
+        of the id. save() rewrites only the shards touched since the last
+        save (the journal is not used) and reload() parses the changed
+        shards, reading them on HBNB_FS_LOAD_WORKERS threads.
+
+        HBNB_FS_FORMAT=binary stores snapshots and shards in the compact
+        binary_snapshot format (file.bin) instead of JSON.
+
+        Every save also persists the instances BaseModel recorded as
+        dirty. With HBNB_FS_WRITE_BEHIND=<seconds> save() only queues the
+        changes: a background thread flushes them through the journal (or
+        the dirty shards) every interval, or as soon as
+        HBNB_FS_WRITE_BEHIND_MAX objects are waiting, and once more at
+        exit.
+
+        Files are replaced atomically (temporary file, fsync, rename) and
+        an advisory lock file next to them serializes processes: writers
+        hold it exclusively while they merge what other processes saved
+        and write, readers hold it shared while they reload.
+
+        all() hands out read-only snapshots that stay consistent while
+        other threads write. Every write bumps __version under the
+        storage lock; a reader returns the snapshot cached for the
+        current version without locking, or takes the lock to copy a new
+        one, so it never sees a half applied new(), delete() or reload().
     '''
-    __file_path = "file.json"
+    if getenv("HBNB_FS_FORMAT", "json") == "binary":
+        __codec = binary_snapshot
+    else:
+        __codec = json_stream
+    __file_path = "file" + __codec.EXTENSION
     __objects = {}
+    __index = {}
+    __relations = {"City": ("state_id",),
+                   "Place": ("city_id", "user_id", "amenity_ids"),
+                   "Review": ("place_id", "user_id")}
+    __related = {}
+    __links = {}
+    __pending = {}
+    __journal = getenv("HBNB_FS_JOURNAL", "0") == "1"
+    __journal_max = int(getenv("HBNB_FS_JOURNAL_MAX", 1024 * 1024))
+    __signature = None
+    __fingerprints = {}
+    __journal_offset = 0
+    __generation = 0
+    __lazy = getenv("HBNB_FS_LAZY", "0") == "1"
+    __raw = set()
+    __hydrated = 0
+    __shard_dir = getenv("HBNB_FS_SHARD_DIR")
+    __partitions = int(getenv("HBNB_FS_PARTITIONS", 1))
+    __load_workers = int(getenv("HBNB_FS_LOAD_WORKERS", 1))
+    __shard_signatures = {}
+    __write_behind = float(getenv("HBNB_FS_WRITE_BEHIND", 0))
+    __write_behind_max = int(getenv("HBNB_FS_WRITE_BEHIND_MAX", 1000))
+    __flusher = None
+    __wakeup = threading.Event()
+    __lock = threading.RLock()
+    __lock_depth = 0
+    __version = 0
+    __views = {}
 
-    def all(self, cls=None):
+    @property
+    def generation(self):
         '''
-            Return the dictionary
+            Number of times the store changed through save or reload
         '''
-        new_dict = {}
-        if cls is None:
-            return self.__objects
+        return FileStorage.__generation
 
-        if cls != "":
-            for k, v in self.__objects.items():
-                if cls == k.split(".")[0]:
-                    new_dict[k] = v
-            return new_dict
+    @property
+    def hydrated(self):
+        '''
+            Number of model instances built from records read from disk
+        '''
+        return FileStorage.__hydrated
+
+    def all(self, cls=None):
+        '''
+            Return a read-only snapshot of the stored objects by key
+            Args:
+                cls (str or class): only return objects of this class
+        '''
+        if cls is None or cls == "":
+            name = None
+            source = FileStorage.__objects
         else:
-            return self.__objects
+            name = self.__class_name(cls)
+            source = FileStorage.__index
+        view = FileStorage.__views.get(name)
+        if (view is not None and view[0] == FileStorage.__version and
+                view[1] is source):
+            return view[2]
+
+        with FileStorage.__lock:
+            version = FileStorage.__version
+            if name is None:
+                for key in list(FileStorage.__raw):
+                    self.__hydrate(key)
+                objs = dict(source)
+            else:
+                index = source.get(name, {})
+                if FileStorage.__raw:
+                    for id, obj in list(index.items()):
+                        if type(obj) is dict:
+                            self.__hydrate(name + "." + id)
+                objs = {name + "." + id: obj for id, obj in index.items()}
+            view = (version, source, MappingProxyType(objs))
+            FileStorage.__views[name] = view
+        return view[2]
 
     def new(self, obj):
         '''
@@ -36,33 +166,703 @@ class FileStorage:
                 obj : An instance object.
         '''
         key = str(obj.__class__.__name__) + "." + str(obj.id)
-        value_dict = obj
-        FileStorage.__objects[key] = value_dict
+        with FileStorage.__lock:
+            self.__put(key, obj)
+            FileStorage.__pending[key] = obj
+
+    def new_many(self, objs, cls=None, save=True):
+        '''
+            Register many objects and save them all at once
+            Arguments:
+                objs: iterable of instances or of dicts of attributes
+                cls (str or class): class of the dicts, see
+                      model_codec.build_many
+                save (bool): False to leave the save to the caller
+            Returns the list of registered instances. Raises ValueError,
+            registering nothing, when an object is invalid or its id is
+            already taken.
+        '''
+        objs = model_codec.build_many(objs, models.classes, cls)
+        with FileStorage.__lock:
+            keys = [obj.__class__.__name__ + "." + obj.id for obj in objs]
+            for key in keys:
+                if key in FileStorage.__objects:
+                    raise ValueError("Duplicate id {}".format(key))
+            for key, obj in zip(keys, objs):
+                self.__put(key, obj)
+                FileStorage.__pending[key] = obj
+        if save:
+            self.save()
+        return objs
+
+    def discard(self, objs):
+        '''
+            Forget objects registered with new or new_many that were not
+            saved yet, without saving
+        '''
+        with FileStorage.__lock:
+            for obj in objs:
+                key = obj.__class__.__name__ + "." + obj.id
+                if FileStorage.__objects.get(key) is obj:
+                    self.__drop(key)
+                    FileStorage.__pending.pop(key, None)
 
     def save(self):
         '''
             Serializes __objects attribute to JSON file.
+            In journal mode only the pending mutations are appended, and
+            in write-behind mode they are left to the flusher thread.
         '''
-        objects_dict = {}
-        for key, val in FileStorage.__objects.items():
-            objects_dict[key] = val.to_dict()
+        if FileStorage.__write_behind > 0:
+            flusher = FileStorage.__flusher
+            if flusher is None or not flusher.is_alive():
+                self.__start_flusher()
+            waiting = (len(FileStorage.__pending) +
+                       models.BaseModel.dirty_count())
+            if waiting >= FileStorage.__write_behind_max:
+                FileStorage.__wakeup.set()
+            return
+        self.flush()
 
-        with open(FileStorage.__file_path, mode='w', encoding="UTF8") as fd:
-            json.dump(objects_dict, fd)
+    def flush(self):
+        '''
+            Persist the pending mutations and the dirty instances now;
+            dirty instances are indexed again, their foreign keys may
+            have changed
+        '''
+        with self.__locked(fcntl.LOCK_EX):
+            for obj in models.BaseModel.pop_dirty():
+                name = obj.__class__.__name__
+                key = name + "." + str(obj.id)
+                if FileStorage.__objects.get(key) is obj:
+                    if name in FileStorage.__relations:
+                        self.__put(key, obj)
+                    FileStorage.__pending.setdefault(key, obj)
+            self.__reload(True)
+            self.__persist()
+
+    def __persist(self):
+        '''
+            Write the pending mutations with the configured layout
+        '''
+        if FileStorage.__shard_dir:
+            self.__write_shards()
+            return
+
+        if ((FileStorage.__journal or FileStorage.__write_behind > 0) and
+                os.path.exists(FileStorage.__file_path)):
+            if (self.__append_journal() and
+                    FileStorage.__journal_offset >= FileStorage.__journal_max):
+                self.compact()
+            return
+
+        self.__write_snapshot()
+
+    def compact(self):
+        '''
+            Fold the journal back into a fresh snapshot.
+        '''
+        with self.__locked(fcntl.LOCK_EX):
+            self.__reload(True)
+            self.__write_snapshot()
+
+    @contextmanager
+    def __locked(self, operation):
+        '''
+            Hold the storage lock and, unless this thread already does,
+            the advisory lock shared with other processes
+            Arguments:
+                operation: fcntl.LOCK_EX to write, fcntl.LOCK_SH to read
+        '''
+        with FileStorage.__lock:
+            fd = None
+            if FileStorage.__lock_depth == 0:
+                fd = self.__open_lock_file(operation == fcntl.LOCK_EX)
+                if fd is not None:
+                    fcntl.flock(fd, operation)
+            FileStorage.__lock_depth += 1
+            try:
+                yield
+            finally:
+                FileStorage.__lock_depth -= 1
+                if fd is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                    os.close(fd)
+
+    def __open_lock_file(self, write):
+        '''
+            Open the lock file of the store, None when it cannot be
+            opened. Only writers create it: until a first save there is
+            nothing for a reader to be protected from.
+        '''
+        if FileStorage.__shard_dir:
+            if write:
+                os.makedirs(FileStorage.__shard_dir, exist_ok=True)
+            path = os.path.join(FileStorage.__shard_dir, ".lock")
+        else:
+            path = FileStorage.__file_path + ".lock"
+        flags = os.O_RDWR | os.O_CREAT if write else os.O_RDONLY
+        try:
+            return os.open(path, flags, 0o644)
+        except OSError:
+            return None
+
+    def __replace(self, path, items):
+        '''
+            Write (key, record) items to a temporary file next to path,
+            fsync it and rename it over path, so a crash leaves either
+            the old or the new file. Returns the fingerprints of the
+            written records.
+        '''
+        fingerprints = {}
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        try:
+            with FileStorage.__codec.open_file(tmp_path, "w") as fd:
+                for key, text in FileStorage.__codec.dump_items(fd, items):
+                    fingerprints[key] = hash(text)
+                fd.flush()
+                os.fsync(fd.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        self.__fsync_dir(path)
+        return fingerprints
+
+    @staticmethod
+    def __fsync_dir(path):
+        '''
+            Make a rename or removal in the directory of path durable
+        '''
+        fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def __start_flusher(self):
+        '''
+            Start the write-behind thread and flush once more at exit
+        '''
+        FileStorage.__flusher = threading.Thread(
+            target=self.__flush_loop, name="FileStorage flusher",
+            daemon=True)
+        FileStorage.__flusher.start()
+        atexit.unregister(self.flush)
+        atexit.register(self.flush)
+
+    def __flush_loop(self):
+        '''
+            Flush every write-behind interval or when woken up, until
+            write-behind is turned off. A failed flush is logged and
+            retried at the next interval, its changes stay pending.
+        '''
+        try:
+            while FileStorage.__write_behind > 0:
+                FileStorage.__wakeup.wait(FileStorage.__write_behind)
+                FileStorage.__wakeup.clear()
+                try:
+                    self.flush()
+                except Exception:
+                    logging.exception("FileStorage write-behind flush failed")
+        finally:
+            FileStorage.__flusher = None
 
     def reload(self):
         '''
-            Deserializes the JSON file to __objects.
+            Deserializes the JSON file to __objects, then replays the
+            journal on top of it. Nothing is read when neither file
+            changed since the last save or reload, and when only the
+            journal grew just its new records are replayed.
+        '''
+        with self.__locked(fcntl.LOCK_SH):
+            self.__reload(FileStorage.__write_behind > 0)
+
+    def __reload(self, keep):
+        '''
+            Body of reload, run with the storage lock held
+            Arguments:
+                keep: keep the pending mutations instead of the content
+                      of the files for the keys they touch
+        '''
+        kept = FileStorage.__pending if keep else {}
+        if FileStorage.__shard_dir:
+            self.__read_shards(kept)
+            return
+
+        signature = self.__stat_files()
+        if signature[0] is None or signature == FileStorage.__signature:
+            return
+
+        old = FileStorage.__signature
+        if (old is not None and old[0] == signature[0] and
+                old[1] is not None and signature[1] is not None and
+                old[1][2] == signature[1][2] and
+                signature[1][1] >= FileStorage.__journal_offset):
+            changes = {}
+            offset = self.__read_journal(changes,
+                                         FileStorage.__journal_offset,
+                                         signature[0][2])
+            self.__merge(((key, val, None) for key, val in changes.items()),
+                         None, kept)
+        else:
+            try:
+                fd = FileStorage.__codec.open_file(
+                    FileStorage.__file_path, "r")
+            except FileNotFoundError:
+                return
+            with fd:
+                changes = {}
+                offset = self.__read_journal(
+                    changes, 0, os.fstat(fd.fileno()).st_ino)
+                stored = {}
+                records = ((key, val, stored.pop(key, None)) for key, val
+                           in FileStorage.__codec.load_items(
+                               fd, fingerprints=stored)
+                           if key not in changes)
+                self.__merge(chain(records, ((key, val, None) for key, val
+                                             in changes.items())),
+                             set(FileStorage.__objects), kept)
+            if not kept:
+                FileStorage.__pending = {}
+
+        FileStorage.__journal_offset = offset
+        FileStorage.__signature = signature
+        FileStorage.__generation += 1
+
+    @staticmethod
+    def __class_name(cls):
+        '''
+            Return the class name for a class or a class name
+        '''
+        if isinstance(cls, str):
+            return cls
+        return cls.__name__
+
+    def related(self, cls, attr, parent_id):
+        '''
+            Return the objects of cls whose foreign key attr points to
+            parent_id, e.g. related("City", "state_id", state.id)
+            Args:
+                cls (str or class): class of the children
+                attr (str): foreign key attribute listed in __relations
+                parent_id (str): id of the parent object
+        '''
+        name = self.__class_name(cls)
+        children = FileStorage.__related.get((name, attr), {})
+        children = children.get(parent_id, {})
+        if FileStorage.__raw:
+            with FileStorage.__lock:
+                for id, obj in list(children.items()):
+                    if type(obj) is dict:
+                        self.__hydrate(name + "." + id)
+        return list(children.values())
+
+    def query(self, cls):
+        '''
+            Return a Query over the objects of cls, see
+            models.engine.query
+            Args:
+                cls (str or class): class queried
+        '''
+        return Query(self.__class_name(cls), self.__plan)
+
+    def __plan(self, query):
+        '''
+            Choose how to run query: a lookup of its id, the reverse
+            index of its foreign key with the fewest candidates, or a
+            scan of the class; the other filters, the order, the limit and
+            the projection are applied to the candidates.
+            Returns (description, function returning the results).
         '''
+        name = query.cls
+        filters = dict(query.filters)
+        if "id" in filters:
+            id = filters.pop("id")
+            path = "get {}.id".format(name)
+
+            def candidates():
+                obj = self.get(name, id)
+                return [] if obj is None else [obj]
+        else:
+            best = None
+            for attr in FileStorage.__relations.get(name, ()):
+                value = filters.get(attr)
+                if value and isinstance(value, str):
+                    size = len(FileStorage.__related.get(
+                        (name, attr), {}).get(value, ()))
+                    if best is None or size < best[1]:
+                        best = (attr, size)
+            if best is not None:
+                attr = best[0]
+                value = filters.pop(attr)
+                path = "index {}.{} ({} candidates)".format(
+                    name, attr, best[1])
+
+                def candidates():
+                    return self.related(name, attr, value)
+            else:
+                path = "scan {} ({} objects)".format(name, self.count(name))
+
+                def candidates():
+                    return self.all(name).values()
+        steps = [path]
+        if filters:
+            steps.append("filter " + ", ".join(filters))
+        if query.aggregates is not None:
+            steps.append("aggregate " + ", ".join(
+                "{}({})".format(*spec) for spec in query.aggregates.values()))
+            if query.group:
+                steps.append("group by " + query.group)
+            return ", ".join(steps), lambda: aggregate(
+                (obj for obj in candidates() if matches(obj, filters)),
+                query.group, query.aggregates)
+        if query.seek is not None:
+            steps.append("after cursor")
+        if query.order:
+            steps.append("order by " + ", ".join(query.order))
+        if query.max_results is not None:
+            steps.append("limit {}".format(query.max_results))
+        if query.loads:
+            steps.append("relationships indexed: " + ", ".join(query.loads))
+        if query.fields is None:
+            return ", ".join(steps), lambda: select(
+                candidates(), filters, query.order, query.max_results,
+                query.seek)
+        steps.append("only " + ", ".join(query.fields))
+        codec = model_codec.for_class(models.classes[name])
+        return ", ".join(steps), lambda: [
+            codec.project(obj.__dict__, query.fields) for obj in select(
+                candidates(), filters, query.order, query.max_results,
+                query.seek)]
+
+    @staticmethod
+    def __build(record):
+        '''
+            Build the model instance described by a serialized record
+        '''
+        FileStorage.__hydrated += 1
+        cls = models.classes[record["__class__"]]
+        return model_codec.for_class(cls).decode(record)
+
+    def __hydrate(self, key):
+        '''
+            Replace the raw record stored under key by its model instance
+            in __objects and every index, and return the instance.
+            Run with the storage lock held.
+        '''
+        if key not in FileStorage.__raw:
+            return FileStorage.__objects.get(key)
+        FileStorage.__raw.discard(key)
+        obj = self.__build(FileStorage.__objects[key])
+        name, id = key.split(".", 1)
+        FileStorage.__objects[key] = obj
+        FileStorage.__index[name][id] = obj
+        for attr, parent_id in FileStorage.__links.get(key, ()):
+            FileStorage.__related[(name, attr)][parent_id][id] = obj
+        return obj
+
+    def __put(self, key, obj):
+        '''
+            Store obj, a model instance or a raw record, under key in
+            __objects, the class index and the reverse indexes of its
+            foreign keys
+        '''
+        self.__unlink(key)
+        FileStorage.__raw.discard(key)
+        FileStorage.__version += 1
+        FileStorage.__objects[key] = obj
+        name, id = key.split(".", 1)
+        FileStorage.__index.setdefault(name, {})[id] = obj
+        if type(obj) is dict:
+            field = obj.get
+        else:
+            field = partial(getattr, obj)
+        links = []
+        for attr in FileStorage.__relations.get(name, ()):
+            parent_ids = field(attr, None)
+            if not isinstance(parent_ids, list):
+                parent_ids = [parent_ids]
+            children = FileStorage.__related.setdefault((name, attr), {})
+            for parent_id in parent_ids:
+                if parent_id:
+                    children.setdefault(parent_id, {})[id] = obj
+                    links.append((attr, parent_id))
+        if links:
+            FileStorage.__links[key] = links
+
+    def __drop(self, key):
+        '''
+            Remove key from __objects and every index
+        '''
+        self.__unlink(key)
+        FileStorage.__raw.discard(key)
+        FileStorage.__version += 1
+        if FileStorage.__objects.pop(key, None) is not None:
+            name, id = key.split(".", 1)
+            FileStorage.__index.get(name, {}).pop(id, None)
+
+    def __unlink(self, key):
+        '''
+            Remove the object stored under key from the reverse indexes
+        '''
+        name, id = key.split(".", 1)
+        for attr, parent_id in FileStorage.__links.pop(key, ()):
+            children = FileStorage.__related[(name, attr)]
+            siblings = children.get(parent_id, {})
+            siblings.pop(id, None)
+            if not siblings:
+                children.pop(parent_id, None)
+
+    @staticmethod
+    def __fingerprint(record):
+        '''
+            Return a hash identifying the content of a serialized record
+        '''
+        return hash(json.dumps(record, default=json_stream.default))
+
+    def __merge(self, items, owned, kept):
+        '''
+            Bring __objects in line with (key, record, fingerprint)
+            triples read from disk, the fingerprint being the hash of the
+            stored form of the record given by the codec, or None to
+            compute it from the record. Only records whose fingerprint
+            changed are re-hydrated. A None record marks a deletion, and
+            keys of the owned set that do not appear in items are dropped
+            as well. Keys found in kept are left as they are.
+        '''
+        fingerprints = FileStorage.__fingerprints
+        seen = set()
+        for key, val, fingerprint in items:
+            if key in kept:
+                seen.add(key)
+                continue
+            if val is None:
+                self.__drop(key)
+                fingerprints.pop(key, None)
+                continue
+            seen.add(key)
+            if fingerprint is None:
+                fingerprint = self.__fingerprint(val)
+            if (fingerprints.get(key) == fingerprint and
+                    key in FileStorage.__objects and
+                    key not in FileStorage.__pending):
+                continue
+            fingerprints[key] = fingerprint
+            if FileStorage.__lazy:
+                self.__put(key, val)
+                FileStorage.__raw.add(key)
+            else:
+                self.__put(key, self.__build(val))
+        for key in (owned or ()):
+            if key not in seen and key not in kept:
+                self.__drop(key)
+                fingerprints.pop(key, None)
+
+    def __journal_path(self):
+        '''
+            Path of the journal kept next to the snapshot
+        '''
+        return FileStorage.__file_path + ".log"
+
+    def __stat_files(self):
+        '''
+            Return (mtime, size, inode) of the snapshot and the journal,
+            None for a file that does not exist
+        '''
+        signature = []
+        for path in (FileStorage.__file_path, self.__journal_path()):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                signature.append(None)
+                continue
+            signature.append((st.st_mtime_ns, st.st_size, st.st_ino))
+        return tuple(signature)
+
+    def __write_snapshot(self):
+        '''
+            Rewrite the whole snapshot and drop the journal it replaces
+        '''
+        fingerprints = self.__replace(FileStorage.__file_path,
+                                      self.__records())
         try:
-            with open(FileStorage.__file_path, encoding="UTF8") as fd:
-                FileStorage.__objects = json.load(fd)
-            for key, val in FileStorage.__objects.items():
-                class_name = val["__class__"]
-                class_name = models.classes[class_name]
-                FileStorage.__objects[key] = class_name(**val)
+            os.remove(self.__journal_path())
+            self.__fsync_dir(FileStorage.__file_path)
         except FileNotFoundError:
             pass
+        FileStorage.__pending = {}
+        FileStorage.__fingerprints = fingerprints
+        FileStorage.__journal_offset = 0
+        FileStorage.__signature = self.__stat_files()
+        FileStorage.__generation += 1
+
+    def __shard_path(self, key):
+        '''
+            Return the path of the shard file holding key
+        '''
+        name, id = key.split(".", 1)
+        if FileStorage.__partitions > 1:
+            part = zlib.crc32(id.encode()) % FileStorage.__partitions
+            name = "{}.{}".format(name, part)
+        return os.path.join(FileStorage.__shard_dir,
+                            name + FileStorage.__codec.EXTENSION)
+
+    def __shard_keys(self, path):
+        '''
+            Return the keys currently stored in the shard file path
+        '''
+        name = os.path.basename(path).split(".")[0]
+        keys = [name + "." + id for id in FileStorage.__index.get(name, {})]
+        if FileStorage.__partitions > 1:
+            keys = [key for key in keys if self.__shard_path(key) == path]
+        return keys
+
+    def __write_shards(self):
+        '''
+            Rewrite the shard files holding a key touched since the
+            last save
+        '''
+        os.makedirs(FileStorage.__shard_dir, exist_ok=True)
+        dirty = {self.__shard_path(key) for key in FileStorage.__pending}
+        for path in dirty:
+            FileStorage.__fingerprints.update(self.__replace(
+                path, self.__records(self.__shard_keys(path))))
+            st = os.stat(path)
+            FileStorage.__shard_signatures[path] = (
+                st.st_mtime_ns, st.st_size, st.st_ino)
+        FileStorage.__pending = {}
+        if dirty:
+            FileStorage.__generation += 1
+
+    @staticmethod
+    def __load_shard(path):
+        '''
+            Parse a shard file, returning its (key, record, fingerprint)
+            triples
+        '''
+        stored = {}
+        with FileStorage.__codec.open_file(path, "r") as fd:
+            return [(key, val, stored.pop(key, None)) for key, val
+                    in FileStorage.__codec.load_items(
+                        fd, fingerprints=stored)]
+
+    def __read_shards(self, kept):
+        '''
+            Merge the shard files that changed since the last save or
+            reload, reading them on HBNB_FS_LOAD_WORKERS threads. Parsing
+            holds the GIL, so threads only overlap the file reads. Keys
+            found in kept are left as they are.
+        '''
+        signatures = {}
+        try:
+            names = os.listdir(FileStorage.__shard_dir)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if name.endswith(FileStorage.__codec.EXTENSION):
+                path = os.path.join(FileStorage.__shard_dir, name)
+                st = os.stat(path)
+                signatures[path] = (st.st_mtime_ns, st.st_size, st.st_ino)
+        old = FileStorage.__shard_signatures
+        changed = [path for path, signature in signatures.items()
+                   if old.get(path) != signature]
+        removed = [path for path in old if path not in signatures]
+        if not changed and not removed:
+            return
+
+        for path in removed:
+            self.__merge((), self.__shard_keys(path), kept)
+        workers = max(1, min(FileStorage.__load_workers, len(changed)))
+        with ThreadPoolExecutor(workers) as pool:
+            for path, items in zip(changed,
+                                   pool.map(self.__load_shard, changed)):
+                self.__merge(items, self.__shard_keys(path), kept)
+        FileStorage.__shard_signatures = signatures
+        if not kept:
+            FileStorage.__pending = {}
+        FileStorage.__generation += 1
+
+    def __records(self, keys=None):
+        '''
+            Yield (key, serialized record) for every stored object, or
+            for the given keys, serializing instances one at a time
+        '''
+        if keys is None:
+            items = FileStorage.__objects.items()
+        else:
+            items = ((key, FileStorage.__objects[key]) for key in keys)
+        for key, val in items:
+            if type(val) is dict:
+                yield key, val
+            else:
+                yield key, model_codec.encode(val)
+
+    def __append_journal(self):
+        '''
+            Append one record per pending mutation to the journal.
+            A record holding a null value marks a deletion. Must run right
+            after __reload, so that anything past the journal offset is a
+            torn record to cut off, and a journal read from offset 0 is
+            started over with a header naming the snapshot inode.
+            Returns False when there was nothing to append.
+        '''
+        if not FileStorage.__pending:
+            return False
+        lines = []
+        for key, val in FileStorage.__pending.items():
+            if val is not None:
+                val = model_codec.encode(val)
+                FileStorage.__fingerprints[key] = self.__fingerprint(val)
+            else:
+                FileStorage.__fingerprints.pop(key, None)
+            lines.append(json.dumps({"key": key, "value": val}) + "\n")
+        with open(self.__journal_path(), mode='a', encoding="UTF8") as fd:
+            if fd.tell() > FileStorage.__journal_offset:
+                fd.truncate(FileStorage.__journal_offset)
+            if FileStorage.__journal_offset == 0:
+                inode = os.stat(FileStorage.__file_path).st_ino
+                fd.write(json.dumps({"snapshot": inode}) + "\n")
+            fd.writelines(lines)
+            fd.flush()
+            os.fsync(fd.fileno())
+        FileStorage.__pending = {}
+        FileStorage.__journal_offset = os.path.getsize(self.__journal_path())
+        FileStorage.__signature = self.__stat_files()
+        FileStorage.__generation += 1
+        return True
+
+    def __read_journal(self, records, offset, inode):
+        '''
+            Apply journal records found past offset onto the records dict
+            in the order they were written, None marking a deletion.
+            A torn trailing record left by a crash is ignored, and so is
+            a journal whose header names another snapshot than inode: it
+            was left behind by a crash before compaction removed it.
+            Returns the offset just past the last complete record.
+        '''
+        try:
+            with open(self.__journal_path(), mode='rb') as fd:
+                fd.seek(offset)
+                for line in fd:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    if "snapshot" in record:
+                        if record["snapshot"] != inode:
+                            return 0
+                    else:
+                        records[record["key"]] = record["value"]
+                    offset += len(line)
+        except FileNotFoundError:
+            return 0
+        return offset
 
     def delete(self, obj=None):
         '''
@@ -70,7 +870,9 @@ class FileStorage:
         '''
         if obj is not None:
             key = str(obj.__class__.__name__) + "." + str(obj.id)
-            FileStorage.__objects.pop(key, None)
+            with FileStorage.__lock:
+                self.__drop(key)
+                FileStorage.__pending[key] = None
             self.save()
 
     def close(self):
@@ -83,27 +885,53 @@ class FileStorage:
         '''
         gets an object
         Args:
-            cls (str): class name
+            cls (str or class): class name
             id (str): object ID
         Returns:
             an object based on class name and its ID
         '''
-        obj_dict = self.all(cls)
-        for k, v in obj_dict.items():
-            matchstring = cls + '.' + id
-            if k == matchstring:
-                return v
-
-        return None
+        name = self.__class_name(cls)
+        obj = FileStorage.__index.get(name, {}).get(id)
+        if type(obj) is dict:
+            with FileStorage.__lock:
+                obj = self.__hydrate(name + "." + id)
+        return obj
 
     def count(self, cls=None):
         '''
         counts number of objects in a class (if given)
         Args:
-            cls (str): class name
+            cls (str or class): class name
         Returns:
             number of objects in class, if no class name given
             return total number of objects in database
         '''
-        obj_dict = self.all(cls)
-        return len(obj_dict)
+        if cls is None or cls == "":
+            return len(FileStorage.__objects)
+        return len(FileStorage.__index.get(self.__class_name(cls), {}))
+
+    def existing_ids(self, cls, ids):
+        '''
+        finds which of the given ids belong to objects of a class
+        Args:
+            cls (str or class): class name
+            ids: iterable of object IDs
+        Returns:
+            the set of the ids found
+        '''
+        with FileStorage.__lock:
+            index = FileStorage.__index.get(self.__class_name(cls), {})
+            return {id for id in ids if id in index}
+
+    def counts(self, classes):
+        '''
+        counts the objects of several classes at once
+        Args:
+            classes: iterable of class names or classes
+        Returns:
+            {class name: number of objects}
+        '''
+        names = [self.__class_name(cls) for cls in classes]
+        with FileStorage.__lock:
+            return {name: len(FileStorage.__index.get(name, {}))
+                    for name in names}
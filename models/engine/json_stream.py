@@ -0,0 +1,151 @@
+#!/usr/bin/python3
+'''
+    Incremental reading and writing of the {key: record} JSON object
+    used by FileStorage, one record at a time.
+'''
+import json
+import re
+from datetime import datetime
+
+
+EXTENSION = ".json"
+DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+WHITESPACE_CHARS = (" ", "\t", "\n", "\r", "")
+
+
+def open_file(path, mode):
+    '''
+        Open a JSON file for reading ("r") or writing ("w")
+    '''
+    return open(path, mode, encoding="UTF8")
+
+
+def default(obj):
+    '''
+        Serialize the datetimes found in records the way
+        BaseModel.to_dict does
+    '''
+    if isinstance(obj, datetime):
+        return obj.isoformat(timespec="microseconds")
+    raise TypeError("{!r} is not JSON serializable".format(obj))
+
+
+def dump_items(fd, items):
+    '''
+        Write a JSON object to fd from (key, record) pairs, one record
+        per line, without building the whole object in memory.
+        Arguments:
+            fd: file object opened for writing text
+            items: iterable of (key, JSON serializable record)
+        Yields the serialized text of each record once it is written.
+    '''
+    sep = "{"
+    for key, record in items:
+        text = json.dumps(record, default=default)
+        fd.write(sep + json.dumps(key) + ": " + text)
+        sep = ",\n"
+        yield key, text
+    if sep == "{":
+        fd.write(sep)
+    fd.write("}")
+
+
+def load_items(fd, chunk_size=65536, fingerprints=None):
+    '''
+        Parse the JSON object stored in fd and yield its (key, record)
+        pairs. At most one chunk plus one record is held in memory.
+        Arguments:
+            fd: file object opened for reading text
+            chunk_size: number of characters read at a time
+            fingerprints: dict in which the hash of the text of each
+                          record is stored under its key before the
+                          record is yielded; it matches the hash of the
+                          text dump_items yields for the same record
+    '''
+    reader = _Reader(fd, chunk_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.decode()
+        reader.expect(":")
+        record = reader.decode()
+        if fingerprints is not None:
+            fingerprints[key] = hash(reader.buf[reader.start:reader.pos])
+        yield key, record
+        if reader.expect(",}") == "}":
+            return
+
+
+class _Reader:
+    '''
+        Buffered JSON tokenizer over a file object
+    '''
+
+    def __init__(self, fd, chunk_size):
+        '''
+            Start reading fd from its current position
+        '''
+        self.fd = fd
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.start = 0
+        self.eof = False
+
+    def fill(self):
+        '''
+            Drop consumed text and read the next chunk.
+            Returns False at end of file.
+        '''
+        if self.eof:
+            return False
+        chunk = self.fd.read(self.chunk_size)
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        self.eof = chunk == ""
+        return not self.eof
+
+    def peek(self):
+        '''
+            Skip whitespace and return the next character, "" at the end
+        '''
+        while True:
+            char = self.buf[self.pos:self.pos + 1]
+            if char not in WHITESPACE_CHARS:
+                return char
+            self.pos = WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or not self.fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, chars):
+        '''
+            Consume the next character, which must be one of chars
+        '''
+        char = self.peek()
+        if char == "" or char not in chars:
+            raise json.JSONDecodeError(
+                "Expecting one of {!r}".format(chars), self.buf, self.pos)
+        self.pos += 1
+        return char
+
+    def decode(self):
+        '''
+            Decode the next JSON value, reading more text as needed; its
+            text is left in buf[start:pos]
+        '''
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            if end == len(self.buf) and self.fill():
+                continue
+            self.start = self.pos
+            self.pos = end
+            return value
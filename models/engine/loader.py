@@ -0,0 +1,170 @@
+#!/usr/bin/python3
+'''
+    Streaming bulk loader of model instances, for seeding and imports.
+
+    Usage: python3 -m models.engine.loader <Class> <file> [batch size]
+
+    The file holds one JSON object per line (JSON lines) or, when its
+    name ends in .csv, one object per row of a CSV file whose header
+    names the attributes; CSV values are converted to the type of the
+    attribute and empty ones are left out. Rows are read and written in
+    batches (10000 by default) so memory does not grow with the file:
+    the foreign keys of a batch are checked with one lookup per
+    referenced class, then the batch goes through storage.new_many, one
+    executemany per table in db mode. Everything is saved or committed
+    once at the end. A failed load leaves nothing behind: db mode rolls
+    back, file mode discards the objects registered so far.
+'''
+import csv
+import json
+import sys
+import time
+from itertools import islice
+import models
+
+
+FOREIGN_KEYS = {"City": {"state_id": "State"},
+                "Place": {"city_id": "City", "user_id": "User"},
+                "Review": {"place_id": "Place", "user_id": "User"}}
+BATCH_SIZE = 10000
+
+
+def convert(cls, attr, value):
+    '''
+        Return value, read from a CSV cell, as the type of attribute
+        attr of cls: its column type in db mode, or the type of its
+        class default in file mode (lists are JSON or ";" separated)
+    '''
+    table = getattr(cls, "__table__", None)
+    if table is not None and attr in table.columns:
+        kind = table.columns[attr].type.python_type
+    else:
+        kind = type(getattr(cls, attr, ""))
+    if kind is list:
+        if value.startswith("["):
+            return json.loads(value)
+        return value.split(";")
+    if kind in (int, float):
+        return kind(value)
+    return value
+
+
+def read_jsonl(f, cls):
+    '''
+        Yield (line number, attributes) of the JSON lines of f
+    '''
+    for number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            raise ValueError("line {}: invalid JSON".format(number))
+        if not isinstance(record, dict):
+            raise ValueError("line {}: not a JSON object".format(number))
+        yield number, record
+
+
+def read_csv(f, cls):
+    '''
+        Yield (line number, attributes) of the rows of the CSV file f
+    '''
+    reader = csv.DictReader(f)
+    for row in reader:
+        try:
+            yield reader.line_num, {attr: convert(cls, attr, value)
+                                    for attr, value in row.items()
+                                    if attr and value not in ("", None)}
+        except ValueError as error:
+            raise ValueError("line {}: {}".format(reader.line_num, error))
+
+
+def check_foreign_keys(storage, name, batch):
+    '''
+        Raise ValueError naming the first row of batch, a list of
+        (line number, attributes), referring to a missing object
+    '''
+    for attr, parent in FOREIGN_KEYS.get(name, {}).items():
+        ids = {record[attr] for number, record in batch if attr in record}
+        missing = ids - storage.existing_ids(parent, ids)
+        for number, record in batch:
+            if record.get(attr) in missing:
+                raise ValueError("line {}: no {} {}".format(
+                    number, parent, record[attr]))
+
+
+def load(storage, name, f, csv_format=False, batch_size=BATCH_SIZE,
+         report=None):
+    '''
+        Create the objects of class name read from the open file f
+        Arguments:
+            storage: the storage engine
+            name (str): class name of the objects
+            csv_format (bool): f is a CSV file, not JSON lines
+            batch_size (int): number of rows read and written at once
+            report: callable called with the number of rows written
+                    after each batch
+        Returns the number of objects created. Raises ValueError naming
+        the line of an invalid row; nothing is saved then.
+    '''
+    cls = models.classes[name]
+    rows = (read_csv if csv_format else read_jsonl)(f, cls)
+    count = 0
+    discard = getattr(storage, "discard", None)
+    registered = []
+    try:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            check_foreign_keys(storage, name, batch)
+            try:
+                objs = storage.new_many([record for number, record
+                                         in batch], name, save=False)
+            except ValueError as error:
+                raise ValueError("lines {}-{}: {}".format(
+                    batch[0][0], batch[-1][0], error))
+            if discard is not None:
+                registered.extend(objs)
+            count += len(batch)
+            if report is not None:
+                report(count)
+    except Exception:
+        if discard is not None:
+            discard(registered)
+        storage.close()
+        raise
+    storage.save()
+    return count
+
+
+def main(argv):
+    '''
+        Load the file named in argv and print the rate, in rows per
+        second; return the exit status
+    '''
+    if len(argv) not in (2, 3) or argv[0] not in models.classes:
+        print("Usage: python3 -m models.engine.loader <Class> <file> "
+              "[batch size]")
+        return 1
+    start = time.perf_counter()
+
+    def report(count):
+        print("{} rows, {:.0f} rows/s".format(
+            count, count / (time.perf_counter() - start)), file=sys.stderr)
+    try:
+        batch_size = int(argv[2]) if len(argv) == 3 else BATCH_SIZE
+        with open(argv[1], "r", newline="") as f:
+            count = load(models.storage, argv[0], f,
+                         argv[1].endswith(".csv"), batch_size, report)
+    except (OSError, ValueError) as error:
+        print("** {} **".format(error))
+        return 1
+    elapsed = time.perf_counter() - start
+    print("{} {} loaded in {:.2f}s, {:.0f} rows/s".format(
+        count, argv[0], elapsed, count / elapsed if elapsed else 0))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+'''
+    Versioned schema migrations of the database of DBStorage.
+
+    Base.metadata.create_all only creates missing tables, so changes to
+    existing tables, such as new indexes, are made by migrations. Each
+    module vNNNN_<name>.py of this package is one migration: its
+    docstring describes it and its upgrade(connection) and
+    downgrade(connection) functions apply and revert it. The versions
+    applied are recorded in the schema_version table.
+
+    Version 0 is the schema create_all built before migrations existed.
+    A new database created by DBStorage.reload already has the current
+    schema, so migrations check for what exists and can run again
+    safely; MySQL commits DDL statements immediately, so a failed
+    migration cannot be rolled back.
+
+    Usage: HBNB_TYPE_STORAGE=db python3 -m models.engine.migrations
+           [status | upgrade [version] | downgrade version]
+'''
+import importlib
+import pkgutil
+from datetime import datetime
+from sqlalchemy import (Column, DateTime, Integer, MetaData, String, Table,
+                        delete, func, insert, select)
+
+
+metadata = MetaData()
+schema_version = Table("schema_version", metadata,
+                       Column("version", Integer, primary_key=True),
+                       Column("description", String(256), nullable=False),
+                       Column("applied_at", DateTime, nullable=False))
+
+
+def migrations():
+    '''
+        Return [(version, module)] of the migrations of this package,
+        ordered by version
+    '''
+    found = []
+    for module in pkgutil.iter_modules(__path__):
+        if module.name[:1] == "v" and module.name[1:5].isdigit():
+            found.append((int(module.name[1:5]), importlib.import_module(
+                __name__ + "." + module.name)))
+    return sorted(found, key=lambda migration: migration[0])
+
+
+def describe(module):
+    '''
+        Return the first line of the docstring of a migration module
+    '''
+    return (module.__doc__ or module.__name__).strip().splitlines()[0]
+
+
+def current_version(engine):
+    '''
+        Return the latest version applied to the database of engine
+    '''
+    with engine.begin() as connection:
+        schema_version.create(connection, checkfirst=True)
+        return connection.scalar(
+            select(func.max(schema_version.c.version))) or 0
+
+
+def migrate(engine, target=None):
+    '''
+        Upgrade the database of engine to version target, the latest
+        when None, or downgrade it when target is older than its version.
+        Each migration runs in its own transaction along with the update
+        of schema_version.
+        Returns [(version, "upgrade" or "downgrade")] of the migrations run.
+        Raises ValueError for an unknown target version.
+    '''
+    known = migrations()
+    versions = [version for version, module in known]
+    if target is None:
+        target = versions[-1] if versions else 0
+    if target != 0 and target not in versions:
+        raise ValueError("Unknown schema version {}".format(target))
+    current = current_version(engine)
+    done = []
+    if target >= current:
+        for version, module in known:
+            if current < version <= target:
+                with engine.begin() as connection:
+                    module.upgrade(connection)
+                    connection.execute(insert(schema_version).values(
+                        version=version, description=describe(module),
+                        applied_at=datetime.now()))
+                done.append((version, "upgrade"))
+    else:
+        for version, module in reversed(known):
+            if target < version <= current:
+                with engine.begin() as connection:
+                    module.downgrade(connection)
+                    connection.execute(delete(schema_version).where(
+                        schema_version.c.version == version))
+                done.append((version, "downgrade"))
+    return done
@@ -0,0 +1,47 @@
+#!/usr/bin/python3
+'''
+    Command line of the migration runner, see models.engine.migrations
+'''
+import sys
+from models import storage
+from models.engine import migrations
+
+
+def main(argv):
+    '''
+        Run the command in argv and return the exit status
+    '''
+    if not hasattr(storage, "migrate"):
+        print("** migrations need HBNB_TYPE_STORAGE=db **")
+        return 1
+    command = argv[0] if argv else "status"
+    try:
+        if command == "status" and len(argv) <= 1:
+            current = storage.schema_version()
+            for version, module in migrations.migrations():
+                print("{} v{:04d} {}".format(
+                    "*" if version <= current else " ", version,
+                    migrations.describe(module)))
+            print("schema version {}".format(current))
+            return 0
+        if command == "upgrade" and len(argv) <= 2:
+            target = int(argv[1]) if len(argv) == 2 else None
+        elif command == "downgrade" and len(argv) == 2:
+            target = int(argv[1])
+            if target > storage.schema_version():
+                raise ValueError("downgrade to an older version")
+        else:
+            print("Usage: python3 -m models.engine.migrations "
+                  "[status | upgrade [version] | downgrade version]")
+            return 1
+        for version, direction in storage.migrate(target):
+            print("{} v{:04d}".format(direction, version))
+        print("schema version {}".format(storage.schema_version()))
+    except ValueError as error:
+        print("** {} **".format(error))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+'''
+    Add the secondary and composite indexes of the API lookups
+
+    cities (state_id, name) lists the cities of a state in name order,
+    places (city_id, price_by_night) the places of a city by price,
+    reviews (place_id, created_at) the reviews of a place by date, and
+    users.email, places.user_id and reviews.user_id find the objects of
+    a user. The same indexes are declared in the models, so databases
+    created after this migration already have them.
+
+    MySQL requires an index on the columns of each foreign key and uses
+    these ones when create_all makes the tables, instead of adding its
+    own. Downgrading keeps an index that is the only one starting with
+    the columns of a foreign key.
+'''
+from sqlalchemy import Index, MetaData, Table, inspect
+
+
+INDEXES = (("ix_cities_state_id_name", "cities", ("state_id", "name")),
+           ("ix_places_city_id_price_by_night", "places",
+            ("city_id", "price_by_night")),
+           ("ix_places_user_id", "places", ("user_id",)),
+           ("ix_reviews_place_id_created_at", "reviews",
+            ("place_id", "created_at")),
+           ("ix_reviews_user_id", "reviews", ("user_id",)),
+           ("ix_users_email", "users", ("email",)))
+
+
+def indexes(connection):
+    '''
+        Return the indexes of this migration, on the reflected tables
+    '''
+    metadata = MetaData()
+    tables = {}
+    found = []
+    for name, table, columns in INDEXES:
+        if table not in tables:
+            tables[table] = Table(table, metadata, autoload_with=connection)
+        found.append(Index(name, *(tables[table].c[column]
+                                   for column in columns)))
+    return found
+
+
+def upgrade(connection):
+    '''
+        Create the indexes missing from the database
+    '''
+    for index in indexes(connection):
+        index.create(connection, checkfirst=True)
+
+
+def backs_foreign_key(connection, index):
+    '''
+        Return True when index is the only index of its table starting
+        with the columns of one of its foreign keys
+    '''
+    inspector = inspect(connection)
+    table = index.table.name
+    columns = [column.name for column in index.columns]
+    others = [other["column_names"] for other in inspector.get_indexes(table)
+              if other["name"] != index.name]
+    others.append(inspector.get_pk_constraint(table)["constrained_columns"])
+    for foreign_key in inspector.get_foreign_keys(table):
+        keys = foreign_key["constrained_columns"]
+        if (columns[:len(keys)] == keys and
+                not any(other[:len(keys)] == keys for other in others)):
+            return True
+    return False
+
+
+def downgrade(connection):
+    '''
+        Drop the indexes of this migration, but those backing a foreign
+        key
+    '''
+    for index in indexes(connection):
+        if not backs_foreign_key(connection, index):
+            index.drop(connection, checkfirst=True)
@@ -0,0 +1,197 @@
+#!/usr/bin/python3
+'''
+    Per-class conversion of model instances to the dict records written
+    by to_dict and back, used by BaseModel, the storage engines and the
+    API views.
+
+    Datetimes are read with datetime.fromisoformat and written with
+    datetime.isoformat, both several times faster than strptime and
+    strftime for the "%Y-%m-%dT%H:%M:%S.%f" format. The formatted
+    created_at and updated_at of an instance are cached in its _stamps
+    slot, outside __dict__, and reused until either attribute is given a
+    new value.
+
+    Instances of unmapped (file storage) classes are decoded without
+    going through __init__ and its per attribute dirty tracking; mapped
+    classes still go through __init__ so SQLAlchemy can set up their
+    state.
+'''
+import uuid
+from datetime import datetime
+
+
+DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+DATETIME_FIELDS = ("created_at", "updated_at")
+PLAIN_TYPES = (str, int, float, bool, list, dict, type(None))
+_codecs = {}
+
+
+def parse_datetime(value):
+    '''
+        Return value, a datetime written by format_datetime, as a datetime
+    '''
+    if type(value) is datetime:
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, DATETIME_FORMAT)
+
+
+def format_datetime(value):
+    '''
+        Return value formatted as "%Y-%m-%dT%H:%M:%S.%f"
+    '''
+    return value.isoformat(timespec="microseconds")
+
+
+def for_class(cls):
+    '''
+        Return the codec of the model class cls, built on first use
+    '''
+    codec = _codecs.get(cls)
+    if codec is None:
+        codec = _codecs[cls] = ModelCodec(cls)
+    return codec
+
+
+def encode(obj):
+    '''
+        Return the to_dict record of a model instance
+    '''
+    return for_class(type(obj)).encode(obj)
+
+
+def build_many(items, classes, cls=None):
+    '''
+        Return the model instances described by items, checking that
+        each belongs to one of classes and that no id repeats.
+        Arguments:
+            items: iterable of model instances or of dicts holding their
+                   attributes
+            classes: {class name: model class} of the accepted classes
+            cls (str or class): class of the dicts without a "__class__"
+                   key, and of every item when given
+        Raises ValueError for an item that does not fit.
+    '''
+    if cls is not None and not isinstance(cls, str):
+        cls = cls.__name__
+    objs = []
+    keys = set()
+    for item in items:
+        if isinstance(item, dict):
+            name = item.get("__class__", cls)
+            if name not in classes:
+                raise ValueError("Unknown class {!r}".format(name))
+            obj = for_class(classes[name]).decode(item)
+        else:
+            name = type(item).__name__
+            if classes.get(name) is not type(item):
+                raise ValueError("Not a model instance: {!r}".format(item))
+            obj = item
+        if cls is not None and name != cls:
+            raise ValueError("Expected {}, got {}".format(cls, name))
+        key = name + "." + obj.id
+        if key in keys:
+            raise ValueError("Duplicate id {}".format(key))
+        keys.add(key)
+        objs.append(obj)
+    return objs
+
+
+class ModelCodec:
+    '''
+        Encoder and decoder of the records of one model class
+    '''
+
+    def __init__(self, cls):
+        '''
+            Prepare the conversions for cls
+        '''
+        self.cls = cls
+        self.name = cls.__name__
+        self.mapped = hasattr(cls, "__mapper__")
+        self.fields = self.__fields()
+
+    def __fields(self):
+        '''
+            Return the entries a record of the class can hold: its class
+            name, its timestamps and its columns, or for unmapped classes
+            the public class attributes holding plain values (their
+            defaults)
+        '''
+        fields = {"__class__", "id"}
+        fields.update(DATETIME_FIELDS)
+        if self.mapped:
+            fields.update(column.key for column in self.cls.__table__.columns)
+            return frozenset(fields)
+        for klass in self.cls.__mro__:
+            fields.update(name for name, value in vars(klass).items()
+                          if name[0] != "_" and
+                          isinstance(value, PLAIN_TYPES))
+        return frozenset(fields)
+
+    def encode(self, obj):
+        '''
+            Return the record of obj: its attributes, its class name and
+            its formatted timestamps
+        '''
+        record = dict(obj.__dict__)
+        if self.mapped:
+            record.pop("_sa_instance_state", None)
+        record["__class__"] = self.name
+        created_at = obj.created_at
+        updated_at = obj.updated_at
+        try:
+            stamps = obj._stamps
+        except AttributeError:
+            stamps = None
+        if (stamps is None or stamps[0] is not created_at or
+                stamps[1] is not updated_at):
+            stamps = (created_at, updated_at, format_datetime(created_at),
+                      format_datetime(updated_at))
+            object.__setattr__(obj, "_stamps", stamps)
+        record["updated_at"] = stamps[3]
+        record["created_at"] = stamps[2]
+        return record
+
+    def project(self, attrs, fields):
+        '''
+            Return the entries named in fields of the record of the
+            instance whose attributes are attrs, without building the
+            other entries
+        '''
+        record = {}
+        for field in fields:
+            if field == "__class__":
+                record[field] = self.name
+            elif field in attrs and field != "_sa_instance_state":
+                value = attrs[field]
+                if field in DATETIME_FIELDS:
+                    value = format_datetime(value)
+                record[field] = value
+        return record
+
+    def decode(self, record):
+        '''
+            Return a new instance holding the attributes of record,
+            which is left untouched
+        '''
+        if self.mapped:
+            return self.cls(**record)
+        obj = self.cls.__new__(self.cls)
+        setattr_ = object.__setattr__
+        for field in DATETIME_FIELDS:
+            if not record.get(field):
+                setattr_(obj, field, datetime.now())
+        for key, val in record.items():
+            if key == "__class__":
+                continue
+            if key in DATETIME_FIELDS:
+                if not val:
+                    continue
+                val = parse_datetime(val)
+            setattr_(obj, key, val)
+        if not obj.id:
+            setattr_(obj, "id", str(uuid.uuid4()))
+        return obj
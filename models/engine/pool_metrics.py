@@ -0,0 +1,178 @@
+#!/usr/bin/python3
+'''
+    Connection pool instrumentation for DBStorage.
+
+    The engine is built with MeteredQueuePool and instrument() hooks the
+    pool and engine events, so PoolMetrics counts checkouts, checkins
+    and new connections, the checkouts that found every connection in
+    use and had to wait (and for how long), the overflow connections
+    opened past pool_size, and the connections found dead by pre-ping.
+    Together they show whether HBNB_MYSQL_POOL_SIZE and
+    HBNB_MYSQL_MAX_OVERFLOW fit the number of server threads.
+
+    QueryCounter counts the statements a block of code sends, to catch
+    lazy relationships loaded once per object in tests:
+
+        with storage.count_queries(max_queries=2):
+            client.get("/cities_by_states")
+'''
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+
+class PoolMetrics:
+    '''
+        Counters of the connection pool of one engine
+    '''
+
+    def __init__(self):
+        '''
+            Start every counter at zero
+        '''
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.peak_overflow = 0
+        self.pre_ping_failures = 0
+        self.invalidations = 0
+
+    def snapshot(self, pool):
+        '''
+            Return the counters and the current state of pool as a dict
+        '''
+        with self.lock:
+            return {"checkouts": self.checkouts, "checkins": self.checkins,
+                    "connects": self.connects, "waits": self.waits,
+                    "wait_seconds": round(self.wait_seconds, 6),
+                    "peak_overflow": self.peak_overflow,
+                    "pre_ping_failures": self.pre_ping_failures,
+                    "invalidations": self.invalidations,
+                    "pool_size": pool.size(),
+                    "checked_out": pool.checkedout(),
+                    "overflow": max(pool.overflow(), 0)}
+
+
+class MeteredQueuePool(QueuePool):
+    '''
+        QueuePool recording in its metrics the checkouts that had to
+        wait for a connection to be returned
+    '''
+    metrics = None
+
+    def _do_get(self):
+        '''
+            Check out a connection, timing it when the pool is exhausted
+        '''
+        busy = (self.metrics is not None and self._max_overflow > -1 and
+                self.checkedout() >= self.size() + self._max_overflow)
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if busy:
+                with self.metrics.lock:
+                    self.metrics.waits += 1
+                    self.metrics.wait_seconds += time.perf_counter() - start
+
+    def recreate(self):
+        '''
+            Return a new pool sharing the metrics of this one
+        '''
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class QueryCounter:
+    '''
+        Context manager counting the statements run on an engine by the
+        current thread, raising AssertionError on exit when there are
+        more than max_queries
+    '''
+
+    def __init__(self, engine, max_queries=None):
+        '''
+            Prepare to count the statements of engine
+        '''
+        self.engine = engine
+        self.max_queries = max_queries
+        self.statements = []
+        self.thread = None
+
+    @property
+    def count(self):
+        '''
+            Number of statements counted so far
+        '''
+        return len(self.statements)
+
+    def __record(self, conn, cursor, statement, parameters, context,
+                 executemany):
+        '''
+            Record a statement run by the counting thread
+        '''
+        if threading.get_ident() == self.thread:
+            self.statements.append(statement)
+
+    def __enter__(self):
+        '''
+            Start counting
+        '''
+        self.thread = threading.get_ident()
+        event.listen(self.engine, "before_cursor_execute", self.__record)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        '''
+            Stop counting and check the count against max_queries
+        '''
+        event.remove(self.engine, "before_cursor_execute", self.__record)
+        if (exc_type is None and self.max_queries is not None and
+                self.count > self.max_queries):
+            raise AssertionError("{} queries run, at most {} expected:\n"
+                                 "{}".format(self.count, self.max_queries,
+                                             "\n".join(self.statements)))
+        return False
+
+
+def instrument(engine):
+    '''
+        Attach a new PoolMetrics to engine and return it
+    '''
+    metrics = PoolMetrics()
+    engine.pool.metrics = metrics
+
+    @event.listens_for(engine, "checkout")
+    def checkout(dbapi_connection, record, proxy):
+        overflow = engine.pool.overflow()
+        with metrics.lock:
+            metrics.checkouts += 1
+            metrics.peak_overflow = max(metrics.peak_overflow, overflow)
+
+    @event.listens_for(engine, "checkin")
+    def checkin(dbapi_connection, record):
+        with metrics.lock:
+            metrics.checkins += 1
+
+    @event.listens_for(engine, "connect")
+    def connect(dbapi_connection, record):
+        with metrics.lock:
+            metrics.connects += 1
+
+    @event.listens_for(engine, "invalidate")
+    def invalidate(dbapi_connection, record, exception):
+        with metrics.lock:
+            metrics.invalidations += 1
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        if getattr(context, "is_pre_ping", False):
+            with metrics.lock:
+                metrics.pre_ping_failures += 1
+
+    return metrics
@@ -0,0 +1,280 @@
+#!/usr/bin/python3
+'''
+    Composable queries over the objects of one model class, e.g.
+
+        storage.query(Place).filter(city_id=city.id).order_by("name")
+        .limit(50)
+
+    load() names the relationships to fetch along with the objects, so
+    templates walking state.cities or place.amenities do not issue one
+    SELECT per object in db mode:
+
+        storage.query(State).order_by("name").load("cities")
+
+    Queries narrowed with only() return to_dict records holding just the
+    named entries instead of model instances, and aggregate() computes
+    count, min, max or avg of attributes, optionally per group, e.g.
+
+        storage.query(Place).aggregate(group_by="city_id",
+                                       places=("count", "id"),
+                                       cheapest=("min", "price_by_night"))
+
+    A Query only records its conditions; the storage engine that built
+    it plans and runs it when its results are first asked for. Every
+    method returns a new Query, so partial queries can be shared.
+'''
+import heapq
+from itertools import islice
+
+
+AGGREGATES = ("count", "min", "max", "avg")
+LOADING = ("selectin", "joined")
+
+
+def matches(obj, filters):
+    '''
+        Return True when obj satisfies every equality filter
+    '''
+    for attr, value in filters.items():
+        field = getattr(obj, attr, None)
+        if isinstance(field, list) and not isinstance(value, list):
+            if value not in field:
+                return False
+        elif field != value:
+            return False
+    return True
+
+
+def select(objs, filters, order, max_results, after=None):
+    '''
+        Filter, sort and cut objs in memory, the way a Query reads.
+        A limit over a single direction order keeps only max_results
+        objects in a heap instead of sorting every match.
+    '''
+    objs = (obj for obj in objs if matches(obj, filters))
+    if not order:
+        if max_results is None:
+            return list(objs)
+        return list(islice(objs, max_results))
+
+    fields = [field.lstrip("-") for field in order]
+
+    def key(obj):
+        return tuple(_sort_key(getattr(obj, field, None))
+                     for field in fields)
+
+    descending = {field.startswith("-") for field in order}
+    if after is not None:
+        bound = tuple(_sort_key(value) for value in after)
+        if True in descending:
+            objs = (obj for obj in objs if key(obj) < bound)
+        else:
+            objs = (obj for obj in objs if key(obj) > bound)
+    if max_results is not None and len(descending) == 1:
+        if True in descending:
+            return heapq.nlargest(max_results, objs, key=key)
+        return heapq.nsmallest(max_results, objs, key=key)
+    objs = list(objs)
+    for field in reversed(order):
+        attr = field.lstrip("-")
+        objs.sort(key=lambda obj: _sort_key(getattr(obj, attr, None)),
+                  reverse=field.startswith("-"))
+    return objs[:max_results]
+
+
+def aggregate(objs, group_by, specs):
+    '''
+        Compute the aggregates of specs {name: (function, attribute)}
+        over objs in a single pass, skipping None values as SQL does.
+        Returns {name: value}, or {group value: {name: value}} when
+        group_by names an attribute.
+    '''
+    groups = {}
+    for obj in objs:
+        key = getattr(obj, group_by, None) if group_by else None
+        accumulators = groups.get(key)
+        if accumulators is None:
+            accumulators = groups[key] = [[0, None] for spec in specs]
+        for accumulator, spec in zip(accumulators, specs.values()):
+            function, attr = spec
+            value = getattr(obj, attr, None)
+            if value is None:
+                continue
+            if function == "count":
+                accumulator[0] += 1
+            elif function == "avg":
+                accumulator[0] += 1
+                accumulator[1] = (value if accumulator[1] is None
+                                  else accumulator[1] + value)
+            elif (accumulator[1] is None or
+                  (value < accumulator[1]) == (function == "min")):
+                accumulator[1] = value
+    if not group_by and not groups:
+        groups[None] = [[0, None] for spec in specs]
+    results = {}
+    for key, accumulators in groups.items():
+        values = {}
+        for name, accumulator in zip(specs, accumulators):
+            function = specs[name][0]
+            if function == "count":
+                values[name] = accumulator[0]
+            elif function == "avg":
+                values[name] = (accumulator[1] / accumulator[0]
+                                if accumulator[0] else None)
+            else:
+                values[name] = accumulator[1]
+        results[key] = values
+    return results if group_by else results[None]
+
+
+def _sort_key(value):
+    '''
+        Sort key placing None before any other value
+    '''
+    return (value is not None, value)
+
+
+class Query:
+    '''
+        Equality filters, ordering, limit and projection over a model
+        class
+    '''
+
+    def __init__(self, cls, plan):
+        '''
+            Start a query over cls, planned by the storage engine
+            Arguments:
+                cls (str or class): model class queried
+                plan: callable taking the query and returning
+                      (description, function returning the results)
+        '''
+        self.cls = cls
+        self.filters = {}
+        self.order = ()
+        self.max_results = None
+        self.seek = None
+        self.fields = None
+        self.group = None
+        self.aggregates = None
+        self.loads = {}
+        self.__plan = plan
+
+    def __copy(self):
+        '''
+            Return a new query with the same conditions
+        '''
+        query = Query(self.cls, self.__plan)
+        query.filters = dict(self.filters)
+        query.order = self.order
+        query.max_results = self.max_results
+        query.seek = self.seek
+        query.fields = self.fields
+        query.group = self.group
+        query.aggregates = self.aggregates
+        query.loads = dict(self.loads)
+        return query
+
+    def filter(self, **conditions):
+        '''
+            Keep the objects whose attributes equal the given values.
+            For a list attribute such as Place.amenity_ids the value must
+            be one of its items.
+        '''
+        query = self.__copy()
+        query.filters.update(conditions)
+        return query
+
+    def order_by(self, *fields):
+        '''
+            Sort by the given attributes, descending when prefixed by "-"
+        '''
+        query = self.__copy()
+        query.order = self.order + fields
+        return query
+
+    def after(self, *values):
+        '''
+            Keep the objects that sort after values, the order_by
+            attributes of the last object of the previous page (keyset
+            pagination). Every order_by field must go the same direction.
+        '''
+        if len(values) != len(self.order):
+            raise ValueError("after() takes one value per order_by field")
+        if len({field.startswith("-") for field in self.order}) != 1:
+            raise ValueError("after() needs a single sort direction")
+        query = self.__copy()
+        query.seek = values
+        return query
+
+    def load(self, *relationships, strategy="selectin"):
+        '''
+            Fetch the given relationships, dotted for nested ones such as
+            "places.reviews", with the objects: "selectin" runs one more
+            SELECT per relationship, "joined" joins it into the query
+        '''
+        if strategy not in LOADING:
+            raise ValueError("Unknown loading strategy {!r}".format(strategy))
+        query = self.__copy()
+        for relationship in relationships:
+            query.loads[relationship] = strategy
+        return query
+
+    def limit(self, count):
+        '''
+            Return at most count objects
+        '''
+        query = self.__copy()
+        query.max_results = count
+        return query
+
+    def only(self, *fields):
+        '''
+            Return the to_dict records of the matching objects cut down to
+            the given entries (attribute names or "__class__") instead of
+            the objects; entries an object does not have are left out
+        '''
+        query = self.__copy()
+        query.fields = fields
+        return query
+
+    def all(self):
+        '''
+            Run the query and return the list of matching objects, or of
+            their records when narrowed with only()
+        '''
+        return self.__plan(self)[1]()
+
+    def aggregate(self, group_by=None, **specs):
+        '''
+            Run the query as aggregates named after the keywords of specs,
+            each a (function, attribute) pair with function one of count,
+            min, max or avg. Order, limit and projection do not apply.
+            Returns {name: value}, or {group value: {name: value}} when
+            group_by names an attribute.
+        '''
+        for function, attr in specs.values():
+            if function not in AGGREGATES:
+                raise ValueError("Unknown aggregate {!r}".format(function))
+        query = self.__copy()
+        query.group = group_by
+        query.aggregates = specs
+        return self.__plan(query)[1]()
+
+    def first(self):
+        '''
+            Return the first matching object, None when there is none
+        '''
+        objs = self.limit(1).all()
+        return objs[0] if objs else None
+
+    def explain(self):
+        '''
+            Describe how the storage engine runs the query
+        '''
+        return self.__plan(self)[0]
+
+    def __iter__(self):
+        '''
+            Iterate over the matching objects
+        '''
+        return iter(self.all())
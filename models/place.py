@@ -3,10 +3,11 @@
     Define the class Place.
 '''
 from os import getenv
-from sqlalchemy import Column, String, Integer, Float, ForeignKey, Table
+from sqlalchemy import (Column, String, Integer, Float, ForeignKey, Table,
+                        Index)
 from sqlalchemy.orm import relationship
 from models.base_model import BaseModel, Base
-# from models.amenity import Amenity
+import models
 
 
 place_amenity = Table('place_amenity', Base.metadata,
@@ -33,6 +34,9 @@ class Place(BaseModel, Base):
         price_by_night = Column(Integer, default=0, nullable=False)
         latitude = Column(Float, nullable=True)
         longitude = Column(Float, nullable=True)
+        __table_args__ = (Index("ix_places_city_id_price_by_night",
+                                "city_id", "price_by_night"),
+                          Index("ix_places_user_id", "user_id"))
         reviews = relationship("Review", backref="place",
                                cascade="all, delete, delete-orphan")
         amenities = relationship("Amenity", secondary=place_amenity,
@@ -57,31 +61,27 @@ class Place(BaseModel, Base):
                 Return list: review instances if Review.place_id==curr place.id
                 FileStorage relationship between Place and Review
             '''
-            list_reviews = []
-            for review in models.storage.all(Review).values():
-                if review.place_id == self.id:
-                    list_reviews.append(review)
-            return list_reviews
+            return models.storage.related("Review", "place_id", self.id)
 
         @property
         def amenities(self):
             '''
-                Return list: amenity inst's if Amenity.place_id=curr place.id
+                Return list: amenity instances whose id is in amenity_ids
                 FileStorage many to many relationship between Place and Amenity
             '''
             list_amenities = []
-            for amenity in models.storage.all(Amenity).values():
-                if amenity.place_id == self.id:
-                    amenity_list.append(amenity)
+            for amenity_id in self.amenity_ids:
+                amenity = models.storage.get("Amenity", amenity_id)
+                if amenity is not None:
+                    list_amenities.append(amenity)
             return list_amenities
 
         @amenities.setter
         def amenities(self, amenity=None):
             '''
-                Set list: amenity instances if Amenity.place_id==curr place.id
-                Set by adding instance objs to amenity_ids attribute in Place
+                Link an Amenity instance by adding its id to amenity_ids
             '''
-            if amenity:
-                for amenity in models.storage.all(Amenity).values():
-                    if amenity.place_id == self.id:
-                        amenity_ids.append(amenity)
+            if (amenity and amenity.__class__.__name__ == "Amenity" and
+                    amenity.id not in self.amenity_ids):
+                self.amenity_ids = self.amenity_ids + [amenity.id]
+                models.storage.new(self)
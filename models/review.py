@@ -3,7 +3,7 @@
     Implementation of the Review class
 '''
 from os import getenv
-from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy import Column, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from models.base_model import BaseModel, Base
 
@@ -17,6 +17,9 @@ class Review(BaseModel, Base):
         text = Column(String(1024), nullable=False)
         place_id = Column(String(60), ForeignKey("places.id"), nullable=False)
         user_id = Column(String(60), ForeignKey("users.id"), nullable=False)
+        __table_args__ = (Index("ix_reviews_place_id_created_at", "place_id",
+                                "created_at"),
+                          Index("ix_reviews_user_id", "user_id"))
     else:
         place_id = ""
         user_id = ""
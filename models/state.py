@@ -30,8 +30,4 @@ class State(BaseModel, Base):
                 State.id
                 FileStorage relationship between State and City
             '''
-            list_cities = []
-            for city in models.storage.all("City").values():
-                if city.state_id == self.id:
-                    list_cities.append(city)
-            return list_cities
+            return models.storage.related("City", "state_id", self.id)
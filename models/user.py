@@ -3,7 +3,7 @@
     Implementation of the User class which inherits from BaseModel
 '''
 from os import getenv
-from sqlalchemy import Column, String
+from sqlalchemy import Column, String, Index
 from sqlalchemy.orm import relationship
 from models.base_model import BaseModel, Base
 
@@ -18,6 +18,7 @@ class User(BaseModel, Base):
         password = Column(String(128), nullable=False)
         first_name = Column(String(128), nullable=True)
         last_name = Column(String(128), nullable=True)
+        __table_args__ = (Index("ix_users_email", "email"),)
         places = relationship("Place", backref="user",
                               cascade="all, delete, delete-orphan")
         reviews = relationship("Review", backref="user",
@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+import os
+import unittest
+from api.v1.app import app
+from models import storage
+from models.engine.file_storage import FileStorage
+from models.state import State
+
+
+@unittest.skipIf(os.getenv("HBNB_TYPE_STORAGE") == "db",
+                 "file storage test")
+class TestFields(unittest.TestCase):
+    """
+    Test cases for the ?fields= projection of the read routes.
+    """
+
+    def setUp(self):
+        """
+        Store one state.
+        """
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__index = {}
+        FileStorage._FileStorage__related = {}
+        FileStorage._FileStorage__links = {}
+        self.state = State(name="Nevada")
+        storage.new(self.state)
+        storage.save()
+        self.client = app.test_client()
+        self.url = "/api/v1/states/{}".format(self.state.id)
+
+    def tearDown(self):
+        """
+        Remove the saved files.
+        """
+        for path in ("file.json", "file.json.lock"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_fields_of_one(self):
+        """
+        Test that only the requested entries of an object are returned.
+        """
+        resp = self.client.get(self.url + "?fields=name,__class__")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.get_json(),
+                         {"name": "Nevada", "__class__": "State"})
+
+    def test_fields_of_list_and_page(self):
+        """
+        Test that lists and pages are projected the same way.
+        """
+        resp = self.client.get("/api/v1/states?fields=name")
+        self.assertEqual(resp.get_json(), [{"name": "Nevada"}])
+        resp = self.client.get("/api/v1/states?fields=name&limit=1")
+        self.assertEqual(resp.get_json(),
+                         {"next": None, "results": [{"name": "Nevada"}]})
+
+    def test_empty_fields(self):
+        """
+        Test that an empty ?fields= gives empty records.
+        """
+        self.assertEqual(self.client.get(self.url + "?fields=").get_json(),
+                         {})
+        resp = self.client.get("/api/v1/states?fields=")
+        self.assertEqual(resp.get_json(), [{}])
+
+    def test_unknown_fields(self):
+        """
+        Test that names other than the entries of the records are
+        rejected.
+        """
+        for fields in ("foo", "name,foo", "cities", "save", "_cache",
+                       "__dict__"):
+            resp = self.client.get(self.url + "?fields=" + fields)
+            self.assertEqual(resp.status_code, 400, fields)
+            resp = self.client.get("/api/v1/states?fields=" + fields)
+            self.assertEqual(resp.status_code, 400, fields)
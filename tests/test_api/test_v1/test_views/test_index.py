@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+import os
+import unittest
+from api.v1.app import app
+from models import storage
+from models.engine.file_storage import FileStorage
+from models.state import State
+
+
+@unittest.skipIf(os.getenv("HBNB_TYPE_STORAGE") == "db",
+                 "file storage test")
+class TestBulkCreate(unittest.TestCase):
+    """
+    Test cases for the bulk creation route.
+    """
+
+    def setUp(self):
+        """
+        Start from an empty storage holding one saved state.
+        """
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__index = {}
+        FileStorage._FileStorage__related = {}
+        FileStorage._FileStorage__links = {}
+        self.state = State(name="Nevada")
+        storage.new(self.state)
+        storage.save()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        """
+        Remove the saved files.
+        """
+        for path in ("file.json", "file.json.lock"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_bulk_create(self):
+        """
+        Test that every item is created and returned.
+        """
+        resp = self.client.post("/api/v1/cities/bulk", json=[
+            {"state_id": self.state.id, "name": "Reno"},
+            {"state_id": self.state.id, "name": "Elko"}])
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual([city["name"] for city in resp.get_json()],
+                         ["Reno", "Elko"])
+        self.assertEqual(storage.count("City"), 2)
+
+    def test_private_keys_dropped(self):
+        """
+        Test that keys starting with an underscore are not set.
+        """
+        resp = self.client.post("/api/v1/states/bulk", json=[
+            {"name": "Utah", "_cache": [{"name": "forged"}, None],
+             "__dict__": 5}])
+        self.assertEqual(resp.status_code, 201)
+        state = storage.get("State", resp.get_json()[0]["id"])
+        state.save()
+        self.assertEqual(state.to_dict()["name"], "Utah")
+        resp = self.client.get("/api/v1/states/{}".format(state.id))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.get_json()["name"], "Utah")
+
+    def test_missing_parent(self):
+        """
+        Test that items referring to a missing parent are rejected and
+        nothing is created.
+        """
+        resp = self.client.post("/api/v1/cities/bulk", json=[
+            {"state_id": self.state.id, "name": "Reno"},
+            {"state_id": "nope", "name": "Elko"}])
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn(b"no State nope", resp.data)
+        self.assertEqual(storage.count("City"), 0)
+
+    def test_not_a_list(self):
+        """
+        Test that a body other than a list of objects is rejected.
+        """
+        resp = self.client.post("/api/v1/states/bulk", json={"name": "a"})
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.post("/api/v1/states/bulk", json=[{}])
+        self.assertEqual(resp.status_code, 400)
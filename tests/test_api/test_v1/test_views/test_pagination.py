@@ -0,0 +1,140 @@
+#!/usr/bin/python3
+import base64
+import json
+import os
+import unittest
+from datetime import datetime, timedelta
+from api.v1.app import app
+from models import storage
+from models.engine.file_storage import FileStorage
+from models.city import City
+from models.state import State
+
+
+def cursor_of(values):
+    """
+    Encode values the way encode_cursor does.
+    """
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+@unittest.skipIf(os.getenv("HBNB_TYPE_STORAGE") == "db",
+                 "file storage test")
+class TestPagination(unittest.TestCase):
+    """
+    Test cases for the keyset pagination of list routes.
+    """
+
+    def setUp(self):
+        """
+        Store a state with five cities.
+        """
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__index = {}
+        FileStorage._FileStorage__related = {}
+        FileStorage._FileStorage__links = {}
+        self.state = State(name="Nevada")
+        storage.new(self.state)
+        self.cities = []
+        for i in range(5):
+            city = City(name="c{}".format(i), state_id=self.state.id)
+            city.created_at = datetime(2020, 1, 1) + timedelta(days=i)
+            storage.new(city)
+            self.cities.append(city)
+        storage.save()
+        self.client = app.test_client()
+        self.url = "/api/v1/states/{}/cities".format(self.state.id)
+
+    def tearDown(self):
+        """
+        Remove the saved files.
+        """
+        for path in ("file.json", "file.json.lock"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def pages(self, query):
+        """
+        Return the pages of results reached by following next.
+        """
+        pages = []
+        resp = self.client.get(self.url + query)
+        while True:
+            self.assertEqual(resp.status_code, 200)
+            body = resp.get_json()
+            pages.append(body["results"])
+            if body["next"] is None:
+                return pages
+            resp = self.client.get(self.url + "?limit=2&cursor=" +
+                                   body["next"])
+
+    def test_without_limit(self):
+        """
+        Test that the whole list is returned without limit or cursor.
+        """
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.get_json()), 5)
+
+    def test_next_chaining(self):
+        """
+        Test that following next visits every object once, in order.
+        """
+        pages = self.pages("?limit=2")
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        ids = [city["id"] for page in pages for city in page]
+        self.assertEqual(ids, sorted(city.id for city in self.cities))
+
+    def test_next_chaining_by_created_at(self):
+        """
+        Test that the order of the first page is kept by its cursors.
+        """
+        pages = self.pages("?limit=2&order_by=created_at")
+        names = [city["name"] for page in pages for city in page]
+        self.assertEqual(names, ["c0", "c1", "c2", "c3", "c4"])
+
+    def test_exact_last_page(self):
+        """
+        Test that no cursor is given when the objects fill the page.
+        """
+        resp = self.client.get(self.url + "?limit=5")
+        self.assertIsNone(resp.get_json()["next"])
+        self.assertEqual(len(resp.get_json()["results"]), 5)
+
+    def test_limit_bounds(self):
+        """
+        Test that limits out of 1-1000 or not integers are rejected.
+        """
+        for limit in ("0", "-1", "1001", "x", "1.5", ""):
+            resp = self.client.get(self.url + "?limit=" + limit)
+            self.assertEqual(resp.status_code, 400, limit)
+        for limit in ("1", "1000"):
+            resp = self.client.get(self.url + "?limit=" + limit)
+            self.assertEqual(resp.status_code, 200, limit)
+
+    def test_invalid_order_by(self):
+        """
+        Test that only the known page orders are accepted.
+        """
+        resp = self.client.get(self.url + "?limit=2&order_by=name")
+        self.assertEqual(resp.status_code, 400)
+
+    def test_tampered_cursors(self):
+        """
+        Test that cursors not made by encode_cursor are rejected.
+        """
+        first = self.client.get(self.url + "?limit=2").get_json()["next"]
+        for cursor in ("garbage", "!!!", first[:-4], cursor_of(["id", 1]),
+                       cursor_of(["id"]), cursor_of(["id", "a", "b"]),
+                       cursor_of(["name", "a"]), cursor_of("id"),
+                       cursor_of([]), cursor_of(["created_at", "x", "a"]),
+                       cursor_of(["created_at", 1, "a"])):
+            resp = self.client.get(self.url + "?cursor=" + cursor)
+            self.assertEqual(resp.status_code, 400, cursor)
+
+    def test_missing_parent(self):
+        """
+        Test that listing the cities of a missing state gives 404.
+        """
+        resp = self.client.get("/api/v1/states/nope/cities?limit=2")
+        self.assertEqual(resp.status_code, 404)
@@ -1,4 +1,5 @@
 import unittest
+import json
 from datetime import datetime
 from models.base_model import BaseModel
 import uuid
@@ -127,6 +128,53 @@ class TestBaseModel(unittest.TestCase):
         new_model = BaseModel(**model_dict)
         self.assertEqual(new_model.new_attr, 'new_value')
 
+    def test_new_instance_is_clean(self):
+        """
+        Test that attributes set by __init__ are not dirty.
+        """
+        self.assertEqual(self.model.dirty_fields(), set())
+        model = BaseModel(**self.model.to_dict())
+        self.assertEqual(model.dirty_fields(), set())
+
+    def test_assignment_marks_dirty(self):
+        """
+        Test that assigned attributes are recorded until popped.
+        """
+        self.model.name = "Betty"
+        self.model.number = 89
+        self.assertEqual(self.model.dirty_fields(), {"name", "number"})
+        self.assertGreaterEqual(BaseModel.dirty_count(), 1)
+        dirty = BaseModel.pop_dirty()
+        self.assertEqual(dirty[self.model], {"name", "number"})
+        self.assertEqual(self.model.dirty_fields(), set())
+
+    def test_to_dict_cache(self):
+        """
+        Test that to_dict is cached until an attribute is assigned.
+        """
+        stats = BaseModel.cache_stats()
+        first = self.model.to_dict()
+        first["name"] = "changed by caller"
+        self.assertNotIn("name", self.model.to_dict())
+        self.assertEqual(BaseModel.cache_stats(),
+                         {"hits": stats["hits"] + 1,
+                          "misses": stats["misses"] + 1})
+        self.model.name = "Betty"
+        self.assertEqual(self.model.to_dict()["name"], "Betty")
+        self.assertEqual(BaseModel.cache_stats()["misses"],
+                         stats["misses"] + 2)
+
+    def test_to_json(self):
+        """
+        Test that to_json encodes the current to_dict.
+        """
+        self.assertEqual(json.loads(self.model.to_json()),
+                         self.model.to_dict())
+        self.assertIs(self.model.to_json(), self.model.to_json())
+        self.model.save()
+        self.assertEqual(json.loads(self.model.to_json())["updated_at"],
+                         self.model.to_dict()["updated_at"])
+
 
 if __name__ == '__main__':
     unittest.main()
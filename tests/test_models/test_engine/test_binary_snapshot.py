@@ -0,0 +1,184 @@
+#!/usr/bin/python3
+import unittest
+import io
+import json
+import marshal
+import os
+import tempfile
+from datetime import datetime
+from models.engine import binary_snapshot, json_stream
+from models.engine.file_storage import FileStorage
+from models.state import State
+from models.place import Place
+
+
+class TestBinarySnapshot(unittest.TestCase):
+    """
+    Test cases for the binary snapshot format.
+    """
+
+    def setUp(self):
+        """
+        Set up records covering every value type.
+        """
+        self.records = {}
+        for i in range(5):
+            place = Place(name="Loft {}".format(i), city_id="c1",
+                          amenity_ids=["a", "b"], latitude=1.5,
+                          number_rooms=i, description=None).to_dict()
+            self.records["Place." + place["id"]] = place
+        self.records["custom key"] = {"id": "7", "__class__": "State",
+                                      "created_at": "2017-06-14T22:31:03",
+                                      "flag": True}
+
+    def dump(self, records):
+        """
+        Encode records and return the snapshot bytes.
+        """
+        fd = io.BytesIO()
+        self.stored = dict(binary_snapshot.dump_items(fd, records.items()))
+        self.assertEqual(list(self.stored), list(records))
+        return fd.getvalue()
+
+    def load(self, data):
+        """
+        Decode snapshot bytes back to a records dict, checking that the
+        fingerprints match the stored forms written.
+        """
+        fingerprints = {}
+        records = dict(binary_snapshot.load_items(io.BytesIO(data),
+                                                  fingerprints))
+        self.assertEqual(fingerprints, {key: hash(stored) for key, stored
+                                        in self.stored.items()})
+        return records
+
+    def test_round_trip(self):
+        """
+        Test that records decode to the same values, dates as datetimes.
+        """
+        loaded = self.load(self.dump(self.records))
+        self.assertEqual(list(loaded), list(self.records))
+        for key, record in loaded.items():
+            self.assertEqual(json.loads(json.dumps(
+                record, default=json_stream.default)), self.records[key])
+        place = next(iter(loaded.values()))
+        self.assertIsInstance(place["created_at"], datetime)
+        self.assertEqual(loaded["custom key"]["created_at"],
+                         "2017-06-14T22:31:03")
+
+    def test_strings_shaped_like_dates(self):
+        """
+        Test that only created_at and updated_at become datetimes.
+        """
+        state = State(name="2020-01-01T00:00:00.000000").to_dict()
+        loaded = self.load(self.dump({"State." + state["id"]: state}))
+        record = loaded["State." + state["id"]]
+        self.assertEqual(record["name"], "2020-01-01T00:00:00.000000")
+        self.assertIsInstance(record["updated_at"], datetime)
+
+    def test_load_version_1(self):
+        """
+        Test that snapshots with marshal blocks are still read.
+        """
+        block = marshal.dumps((["id", "__class__", "1", "State"],
+                               [((0, "s"), (1, "s"))], [(0, None, 2, 3)]), 4)
+        data = (binary_snapshot.HEADER.pack(binary_snapshot.MAGIC, 1) +
+                binary_snapshot.LENGTH.pack(len(block)) + block)
+        self.assertEqual(dict(binary_snapshot.load_items(io.BytesIO(data))),
+                         {"State.1": {"id": "1", "__class__": "State"}})
+
+    def test_round_trip_many_blocks(self):
+        """
+        Test records spread over several blocks.
+        """
+        block_size = binary_snapshot.BLOCK_SIZE
+        binary_snapshot.BLOCK_SIZE = 2
+        try:
+            data = self.dump(self.records)
+        finally:
+            binary_snapshot.BLOCK_SIZE = block_size
+        self.assertEqual(list(self.load(data)), list(self.records))
+        self.assertEqual(self.load(self.dump({})), {})
+
+    def test_strings_are_deduplicated(self):
+        """
+        Test that a repeated string is stored once.
+        """
+        data = self.dump(self.records)
+        self.assertEqual(data.count(b"Loft 1"), 1)
+        self.assertEqual(data.count(b"city_id"), 1)
+
+    def test_bad_header(self):
+        """
+        Test that a file that is not a snapshot is rejected.
+        """
+        with self.assertRaises(ValueError):
+            self.load(b'{"State.1": {}}')
+
+    def test_json_conversion_is_lossless(self):
+        """
+        Test converting file.json to a snapshot and back.
+        """
+        tmp = tempfile.mkdtemp()
+        src = os.path.join(tmp, "file.json")
+        snapshot = os.path.join(tmp, "file.bin")
+        dst = os.path.join(tmp, "back.json")
+        with open(src, "w") as f:
+            json.dump(self.records, f)
+        binary_snapshot.convert(src, snapshot, json_stream, binary_snapshot)
+        binary_snapshot.convert(snapshot, dst, binary_snapshot, json_stream)
+        with open(dst, "r") as f:
+            self.assertEqual(json.load(f), self.records)
+        for path in (src, snapshot, dst):
+            os.remove(path)
+        os.rmdir(tmp)
+
+
+class TestFileStorageBinary(unittest.TestCase):
+    """
+    Test cases for FileStorage using the binary snapshot format.
+    """
+
+    def setUp(self):
+        """
+        Switch storage to the binary format.
+        """
+        self.storage = FileStorage()
+        FileStorage._FileStorage__codec = binary_snapshot
+        FileStorage._FileStorage__file_path = "file.bin"
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__index = {}
+
+    def tearDown(self):
+        """
+        Restore the JSON format.
+        """
+        FileStorage._FileStorage__codec = json_stream
+        FileStorage._FileStorage__file_path = "file.json"
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__index = {}
+        FileStorage._FileStorage__signature = None
+        for path in ("file.bin", "file.bin.lock"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def test_save_and_reload(self):
+        """
+        Test that objects survive a save and a fresh reload.
+        """
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__index = {}
+        FileStorage._FileStorage__signature = None
+        self.storage.reload()
+        loaded = self.storage.get(State, state.id)
+        self.assertIsNot(loaded, state)
+        self.assertEqual(loaded.to_dict(), state.to_dict())
+
+
+if __name__ == '__main__':
+    unittest.main()
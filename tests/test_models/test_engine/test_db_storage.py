@@ -3,9 +3,17 @@
 Test for db_storage
 """
 
+import importlib
+import threading
 import unittest
+from collections import OrderedDict
+from sqlalchemy import inspect
+from os import getenv
+import models
 from models.engine.db_storage import DBStorage
 from models.user import User
+from models.state import State
+from models.city import City
 """
 Import other necessary models
 """
@@ -36,5 +44,217 @@ class TestDBStorage(unittest.TestCase):
         self.assertEqual(self.storage.count(User), 1)
 
 
+@unittest.skipIf(getenv("HBNB_TYPE_STORAGE") != "db",
+                 "DBStorage tests need HBNB_TYPE_STORAGE=db")
+class TestDBStorageCaches(unittest.TestCase):
+    """
+    Test cases for the caches, sessions and load plans of DBStorage.
+    They run on any database, e.g. HBNB_DB_URL=sqlite:////tmp/hbnb.db.
+    """
+
+    def setUp(self):
+        """
+        Empty the caches and store a state with a city.
+        """
+        self.storage = models.storage
+        DBStorage._DBStorage__cache = OrderedDict()
+        DBStorage._DBStorage__cache_hits = 0
+        DBStorage._DBStorage__cache_misses = 0
+        DBStorage._DBStorage__results = OrderedDict()
+        DBStorage._DBStorage__result_hits = 0
+        DBStorage._DBStorage__result_misses = 0
+        DBStorage._DBStorage__result_evictions = 0
+        DBStorage._DBStorage__result_size = 10
+        self.states = []
+        self.state = self.add_state("California")
+        self.city = City(name="Fresno", state_id=self.state.id)
+        self.storage.new(self.city)
+        self.storage.save()
+        self.storage.close()
+
+    def tearDown(self):
+        """
+        Delete the states stored by the test, with their cities.
+        """
+        DBStorage._DBStorage__result_size = 0
+        self.storage.close()
+        for state in self.states:
+            state = self.storage.get(State, state.id)
+            if state is not None:
+                self.storage.delete(state)
+        self.storage.save()
+        self.storage.close()
+
+    def add_state(self, name):
+        """
+        Store and return a new state.
+        """
+        state = State(name=name)
+        self.storage.new(state)
+        self.storage.save()
+        self.states.append(state)
+        return state
+
+    def in_thread(self, function):
+        """
+        Return the result of function run by another thread.
+        """
+        results = []
+
+        def run():
+            results.append(function())
+            self.storage.close()
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+        return results[0]
+
+    def test_get_cache_follows_deletes(self):
+        """
+        Test that get serves cached objects until they or their parent
+        are deleted.
+        """
+        self.storage.get(City, self.city.id)
+        self.storage.close()
+        self.assertEqual(self.storage.get(City, self.city.id).name, "Fresno")
+        self.assertEqual(self.storage.cache_stats()["hits"], 1)
+        self.storage.delete(self.storage.get(State, self.state.id))
+        self.storage.save()
+        self.storage.close()
+        self.assertIsNone(self.storage.get(City, self.city.id))
+
+    def test_bulk_created_objects_are_persistent(self):
+        """
+        Test that objects returned by new_many can be saved again.
+        """
+        states = State.bulk_create([{"name": "Idaho"}, {"name": "Iowa"}])
+        self.states.extend(states)
+        states[0].name = "Ohio"
+        states[0].save()
+        self.storage.close()
+        self.assertEqual(self.storage.get(State, states[0].id).name, "Ohio")
+        self.assertEqual(self.storage.get(State, states[1].id).name, "Iowa")
+
+    def test_only_unknown_fields(self):
+        """
+        Test that records hold nothing when no field is a column.
+        """
+        query = self.storage.query(State).filter(id=self.state.id)
+        self.assertEqual(query.only("foo").all(), [{}])
+        self.assertEqual(query.only().all(), [{}])
+        self.assertEqual(query.only("__class__").all(),
+                         [{"__class__": "State"}])
+
+    def test_get_cache_holds_detached_copies(self):
+        """
+        Test that unsaved changes to an object got from the cache do
+        not reach other threads.
+        """
+        city = self.storage.get(City, self.city.id)
+        cached = DBStorage._DBStorage__cache["City." + self.city.id][1]
+        self.assertIsNot(cached, city)
+        self.assertTrue(inspect(cached).detached)
+        city.name = "Clovis"
+        self.assertEqual(
+            self.in_thread(lambda: self.storage.get(City, city.id).name),
+            "Fresno")
+        self.assertEqual(self.storage.cache_stats()["hits"], 1)
+
+    def test_sessions_per_thread(self):
+        """
+        Test that each thread works in its own session.
+        """
+        session = self.storage._DBStorage__session
+        self.storage.new(State(name="Oregon"))
+        self.assertFalse(self.in_thread(lambda: list(session().new)))
+        self.assertEqual(len(session().new), 1)
+        self.storage.close()
+        self.assertFalse(session().new)
+
+    def test_pool_metrics(self):
+        """
+        Test that checkouts are counted and returned connections checked
+        in.
+        """
+        before = self.storage.pool_stats()["checkouts"]
+        self.in_thread(lambda: self.storage.count(State))
+        stats = self.storage.pool_stats()
+        self.assertGreater(stats["checkouts"], before)
+        self.assertEqual(stats["checked_out"], 0)
+
+    def test_query_counter(self):
+        """
+        Test that count_queries enforces its limit.
+        """
+        DBStorage._DBStorage__result_size = 0
+        with self.storage.count_queries() as counter:
+            self.storage.query(State).filter(name="Texas").all()
+        self.assertEqual(counter.count, 1)
+        with self.assertRaises(AssertionError):
+            with self.storage.count_queries(max_queries=0):
+                self.storage.query(State).filter(name="Texas").all()
+
+    def test_cities_by_states_queries(self):
+        """
+        Test that /cities_by_states loads states and cities in two
+        queries.
+        """
+        DBStorage._DBStorage__result_size = 0
+        for name in ("Arizona", "Utah"):
+            state = self.add_state(name)
+            self.storage.new(City(name="Mesa", state_id=state.id))
+        self.storage.save()
+        self.storage.close()
+        app = importlib.import_module("web_flask.8-cities_by_states").app
+        with self.storage.count_queries(max_queries=2):
+            response = app.test_client().get("/cities_by_states")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Fresno", response.data)
+
+    def test_results_invalidated_by_other_threads(self):
+        """
+        Test that a save in another thread invalidates the results of
+        its class, and that hits run no query.
+        """
+        count = self.storage.count(State)
+        self.storage.all(State)
+        self.storage.close()
+        with self.storage.count_queries() as counter:
+            self.assertEqual(self.storage.count(State), count)
+            state = self.storage.all(State)["State." + self.state.id]
+        self.assertEqual(counter.count, 0)
+        self.assertEqual([city.name for city in state.cities], ["Fresno"])
+        self.assertEqual(self.storage.result_cache_stats()["hits"], 2)
+        self.storage.close()
+        self.in_thread(lambda: self.add_state("Nevada"))
+        self.assertEqual(self.storage.count(State), count + 1)
+
+    def test_unsaved_changes_bypass_results(self):
+        """
+        Test that a thread sees its unsaved objects while other threads
+        keep the cached results.
+        """
+        count = self.storage.count(State)
+        self.storage.new(State(name="Oregon"))
+        self.assertEqual(self.storage.count(State), count + 1)
+        self.assertEqual(self.in_thread(lambda: self.storage.count(State)),
+                         count)
+        self.storage.close()
+        self.assertEqual(self.storage.count(State), count)
+        stats = self.storage.result_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 1))
+
+    def test_result_evictions(self):
+        """
+        Test that the least recently used results are evicted first.
+        """
+        DBStorage._DBStorage__result_size = 2
+        for name in ("a", "b", "c", "a"):
+            self.storage.query(State).filter(name=name).all()
+        stats = self.storage.result_cache_stats()
+        self.assertEqual((stats["misses"], stats["evictions"], stats["size"]),
+                         (4, 2, 2))
+
+
 if __name__ == "__main__":
     unittest.main()
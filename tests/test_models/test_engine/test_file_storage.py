@@ -1,7 +1,13 @@
 #!/usr/bin/python3
 import unittest
 import os
+import atexit
 import json
+import shutil
+import tempfile
+import time
+import threading
+import models
 from models.base_model import BaseModel
 from models.engine.file_storage import FileStorage
 from models.user import User
@@ -33,10 +39,11 @@ class TestFileStorage(unittest.TestCase):
 
     def tearDown(self):
         """Tear down test environment."""
-        try:
-            os.remove(self.file_path)
-        except FileNotFoundError:
-            pass
+        for path in (self.file_path, self.file_path + ".lock"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
 
     def test_all_returns_dict(self):
         """
@@ -68,6 +75,18 @@ class TestFileStorage(unittest.TestCase):
         self.assertIn(key, data)
         self.assertEqual(data[key]["id"], base_model.id)
 
+    def test_only_writers_create_lock_file(self):
+        """
+        Test that reload does not create the lock file and save does.
+        """
+        FileStorage._FileStorage__signature = None
+        self.storage.reload()
+        self.assertFalse(os.path.exists(self.file_path + ".lock"))
+        self.storage.new(State(name="Utah"))
+        self.storage.save()
+        self.assertTrue(os.path.exists(self.file_path + ".lock"))
+        self.storage.reload()
+
     def test_reload_no_file(self):
         """
         Test that reload doesn't raise an error if file doesn't exist.
@@ -195,6 +214,879 @@ class TestFileStorage(unittest.TestCase):
         self.assertEqual(self.storage.count(), initial_count + 1)
         self.assertEqual(self.storage.count(User), 1)
 
+    def test_class_index_accepts_class_or_name(self):
+        """
+        Test that all, get and count accept a class or its name.
+        """
+        state = State(name="California")
+        self.storage.new(state)
+        key = "State." + state.id
+        self.assertIn(key, self.storage.all(State))
+        self.assertIn(key, self.storage.all("State"))
+        self.assertNotIn(key, self.storage.all(City))
+        self.assertIs(self.storage.get("State", state.id), state)
+        self.assertIs(self.storage.get(State, state.id), state)
+        self.assertEqual(self.storage.count("State"),
+                         self.storage.count(State))
+
+    def test_class_index_follows_delete(self):
+        """
+        Test that deleted objects leave the class index.
+        """
+        state = State(name="California")
+        self.storage.new(state)
+        count = self.storage.count(State)
+        self.storage.delete(state)
+        self.assertIsNone(self.storage.get(State, state.id))
+        self.assertEqual(self.storage.count(State), count - 1)
+        self.assertNotIn("State." + state.id, self.storage.all(State))
+
+    def test_new_many(self):
+        """
+        Test that new_many registers instances and dicts in one save.
+        """
+        state = State(name="California")
+        generation = self.storage.generation
+        objs = self.storage.new_many([state, {"name": "Nevada"}], State)
+        self.assertEqual(self.storage.generation, generation + 1)
+        self.assertIs(objs[0], state)
+        self.assertIsInstance(objs[1], State)
+        with open(self.file_path, "r") as f:
+            data = json.load(f)
+        for obj in objs:
+            self.assertIn("State." + obj.id, data)
+        cities = City.bulk_create([{"name": "Reno",
+                                    "state_id": objs[1].id}])
+        self.assertEqual(objs[1].cities, cities)
+
+    def test_new_many_rejects_invalid_objects(self):
+        """
+        Test that new_many registers nothing when an object is invalid.
+        """
+        state = State(name="California")
+        self.storage.new(state)
+        count = self.storage.count()
+        for objs in ([{"name": "Nevada"}, {"__class__": "Nope"}],
+                     [{"name": "Nevada"}, {"id": state.id}],
+                     [{"name": "Nevada"}, City(name="Reno")]):
+            with self.assertRaises(ValueError):
+                self.storage.new_many(objs, "State")
+        self.assertEqual(self.storage.count(), count)
+
+
+class TestFileStorageJournal(unittest.TestCase):
+    """
+    Test cases for the journaled save mode of FileStorage.
+    """
+
+    def setUp(self):
+        """
+        Switch storage to journal mode on an empty store.
+        """
+        self.storage = FileStorage()
+        self.file_path = "file.json"
+        self.log_path = "file.json.log"
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__index = {}
+        FileStorage._FileStorage__pending = {}
+        FileStorage._FileStorage__journal = True
+
+    def tearDown(self):
+        """
+        Restore snapshot mode and remove written files.
+        """
+        FileStorage._FileStorage__journal = False
+        FileStorage._FileStorage__journal_max = 1024 * 1024
+        for path in (self.file_path, self.log_path, self.file_path + ".lock"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def test_reload_ignores_stale_journal(self):
+        """
+        Test that a journal written against another snapshot is ignored.
+        """
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        with open(self.log_path, "w") as f:
+            f.write(json.dumps({"snapshot": -1}) + "\n")
+            f.write(json.dumps({"key": "State." + state.id,
+                                "value": None}) + "\n")
+        self.forget_loaded_state()
+        self.storage.reload()
+        self.assertIsNotNone(self.storage.get(State, state.id))
+        other = State(name="Nevada")
+        self.storage.new(other)
+        self.storage.save()
+        self.forget_loaded_state()
+        self.storage.reload()
+        self.assertIsNotNone(self.storage.get(State, state.id))
+        self.assertIsNotNone(self.storage.get(State, other.id))
+
+    def forget_loaded_state(self):
+        """
+        Drop in-memory objects as a freshly started process would.
+        """
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__index = {}
+        FileStorage._FileStorage__signature = None
+
+    def test_save_appends_to_journal(self):
+        """
+        Test that saves after the first one only append to the journal.
+        """
+        self.storage.new(State(name="California"))
+        self.storage.save()
+        with open(self.file_path, "r") as f:
+            snapshot = f.read()
+        state = State(name="Nevada")
+        self.storage.new(state)
+        self.storage.save()
+        with open(self.file_path, "r") as f:
+            self.assertEqual(f.read(), snapshot)
+        with open(self.log_path, "r") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]["snapshot"],
+                         os.stat(self.file_path).st_ino)
+        self.assertEqual(records[1]["key"], "State." + state.id)
+
+    def test_save_without_changes(self):
+        """
+        Test that saving nothing new leaves the files as they are.
+        """
+        self.storage.new(State(name="California"))
+        self.storage.save()
+        self.storage.save()
+        self.assertFalse(os.path.exists(self.log_path))
+
+    def test_reload_replays_journal(self):
+        """
+        Test that reload applies journaled updates and deletions.
+        """
+        kept = State(name="California")
+        gone = State(name="Nevada")
+        self.storage.new(kept)
+        self.storage.new(gone)
+        self.storage.save()
+        kept.name = "Arizona"
+        self.storage.new(kept)
+        self.storage.delete(gone)
+        self.storage.save()
+        self.forget_loaded_state()
+        self.storage.reload()
+        objs = self.storage.all()
+        self.assertEqual(objs["State." + kept.id].name, "Arizona")
+        self.assertNotIn("State." + gone.id, objs)
+
+    def test_reload_ignores_torn_record(self):
+        """
+        Test that a partially written trailing record is skipped.
+        """
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        with open(self.log_path, "a") as f:
+            f.write('{"key": "State.x", "val')
+        self.forget_loaded_state()
+        self.storage.reload()
+        self.assertIn("State." + state.id, self.storage.all())
+        self.assertNotIn("State.x", self.storage.all())
+
+    def test_compaction(self):
+        """
+        Test that the journal is folded into the snapshot past its limit.
+        """
+        FileStorage._FileStorage__journal_max = 1
+        self.storage.new(State(name="California"))
+        self.storage.save()
+        state = State(name="Nevada")
+        self.storage.new(state)
+        self.storage.save()
+        self.assertFalse(os.path.exists(self.log_path))
+        with open(self.file_path, "r") as f:
+            self.assertIn("State." + state.id, json.load(f))
+
+
+class TestFileStorageChangeDetection(unittest.TestCase):
+    """
+    Test cases for the change detection done by reload and close.
+    """
+
+    def setUp(self):
+        """
+        Save two states to a fresh file.
+        """
+        self.storage = FileStorage()
+        self.file_path = "file.json"
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__index = {}
+        self.kept = State(name="California")
+        self.changed = State(name="Nevada")
+        self.storage.new(self.kept)
+        self.storage.new(self.changed)
+        self.storage.save()
+
+    def tearDown(self):
+        """
+        Remove written files.
+        """
+        for path in (self.file_path, self.file_path + ".log",
+                     self.file_path + ".lock"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def test_save_merges_other_process_changes(self):
+        """
+        Test that a save keeps objects another process saved meanwhile.
+        """
+        with open(self.file_path, "r") as f:
+            data = json.load(f)
+        other = State(name="Oregon")
+        data["State." + other.id] = other.to_dict()
+        with open(self.file_path + ".new", "w") as f:
+            json.dump(data, f)
+        os.replace(self.file_path + ".new", self.file_path)
+        state = State(name="Texas")
+        self.storage.new(state)
+        self.storage.save()
+        with open(self.file_path, "r") as f:
+            data = json.load(f)
+        for obj in (self.kept, self.changed, other, state):
+            self.assertIn("State." + obj.id, data)
+
+    def test_failed_save_keeps_previous_file(self):
+        """
+        Test that a save failing midway leaves the file as it was.
+        """
+        with open(self.file_path, "r") as f:
+            before = f.read()
+        broken = State(name="Broken")
+        broken.created_at = None
+        self.storage.new(broken)
+        with self.assertRaises(AttributeError):
+            self.storage.save()
+        with open(self.file_path, "r") as f:
+            self.assertEqual(f.read(), before)
+        self.assertEqual([name for name in os.listdir(".")
+                          if name.endswith(".tmp")], [])
+        self.storage.delete(broken)
+
+    def test_close_without_changes_is_noop(self):
+        """
+        Test that close keeps the same objects when the file is unchanged.
+        """
+        generation = self.storage.generation
+        self.storage.close()
+        self.assertEqual(self.storage.generation, generation)
+        self.assertIs(self.storage.get(State, self.kept.id), self.kept)
+
+    def test_reload_merges_changed_records(self):
+        """
+        Test that only records changed by another writer are rebuilt.
+        """
+        with open(self.file_path, "r") as f:
+            data = json.load(f)
+        data["State." + self.changed.id]["name"] = "Arizona"
+        new_state = State(name="Oregon").to_dict()
+        data["State." + new_state["id"]] = new_state
+        with open(self.file_path, "w") as f:
+            json.dump(data, f)
+        generation = self.storage.generation
+        self.storage.reload()
+        self.assertEqual(self.storage.generation, generation + 1)
+        self.assertIs(self.storage.get(State, self.kept.id), self.kept)
+        changed = self.storage.get(State, self.changed.id)
+        self.assertIsNot(changed, self.changed)
+        self.assertEqual(changed.name, "Arizona")
+        self.assertIsNotNone(self.storage.get(State, new_state["id"]))
+
+    def test_reload_reads_journal_tail(self):
+        """
+        Test that records appended to the journal by another writer
+        are picked up.
+        """
+        record = State(name="Oregon").to_dict()
+        key = "State." + record["id"]
+        with open(self.file_path + ".log", "a") as f:
+            f.write(json.dumps({"key": key, "value": record}) + "\n")
+            f.write(json.dumps({"key": "State." + self.changed.id,
+                                "value": None}) + "\n")
+        self.storage.reload()
+        self.assertIn(key, self.storage.all())
+        self.assertIsNone(self.storage.get(State, self.changed.id))
+        self.assertIs(self.storage.get(State, self.kept.id), self.kept)
+
+
+class TestFileStorageSnapshots(unittest.TestCase):
+    """
+    Test cases for the snapshots returned by all.
+    """
+
+    def setUp(self):
+        """
+        Start from an empty store.
+        """
+        self.storage = FileStorage()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__index = {}
+        FileStorage._FileStorage__pending = {}
+
+    def tearDown(self):
+        """
+        Remove written files.
+        """
+        for path in ("file.json", "file.json.lock"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def test_snapshot_is_frozen(self):
+        """
+        Test that a snapshot ignores later writes and is reused.
+        """
+        state = State(name="California")
+        self.storage.new(state)
+        snapshot = self.storage.all()
+        by_class = self.storage.all(State)
+        self.assertIs(self.storage.all(), snapshot)
+        with self.assertRaises(TypeError):
+            snapshot["State.x"] = state
+        self.storage.new(State(name="Nevada"))
+        self.storage.delete(state)
+        self.assertEqual(list(snapshot), ["State." + state.id])
+        self.assertEqual(list(by_class), ["State." + state.id])
+        self.assertIsNot(self.storage.all(), snapshot)
+        self.assertEqual(len(self.storage.all(State)), 1)
+
+    def test_readers_see_whole_writes(self):
+        """
+        Test that readers iterating while a thread writes never see a
+        write half applied.
+        """
+        errors = []
+        done = threading.Event()
+
+        def read():
+            while not done.is_set():
+                try:
+                    if len(self.storage.all(State)) % 2:
+                        errors.append("odd")
+                    for key, obj in self.storage.all().items():
+                        pass
+                except RuntimeError as error:
+                    errors.append(error)
+
+        readers = [threading.Thread(target=read) for i in range(4)]
+        for reader in readers:
+            reader.start()
+        for i in range(50):
+            self.storage.new_many([{"name": "a"}, {"name": "b"}], State)
+        done.set()
+        for reader in readers:
+            reader.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.storage.all(State)), 100)
+
+
+class TestFileStorageQuery(unittest.TestCase):
+    """
+    Test cases for the query API of FileStorage.
+    """
+
+    def setUp(self):
+        """
+        Store two cities with a few places.
+        """
+        self.storage = FileStorage()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__index = {}
+        FileStorage._FileStorage__related = {}
+        FileStorage._FileStorage__links = {}
+        self.city = City(name="Reno")
+        self.other = City(name="Vegas")
+        self.places = [Place(name=name, city_id=self.city.id,
+                             number_rooms=rooms, amenity_ids=["wifi"])
+                       for name, rooms in (("b", 2), ("a", 2), ("c", 1))]
+        self.places.append(Place(name="d", city_id=self.other.id))
+        for obj in [self.city, self.other] + self.places:
+            self.storage.new(obj)
+
+    def test_index_path(self):
+        """
+        Test a query answered from the foreign key index.
+        """
+        query = (self.storage.query(Place).filter(city_id=self.city.id)
+                 .order_by("-number_rooms", "name").limit(2))
+        self.assertEqual(query.explain(),
+                         "index Place.city_id (3 candidates), order by "
+                         "-number_rooms, name, limit 2")
+        self.assertEqual([place.name for place in query], ["a", "b"])
+        query = self.storage.query("Place").filter(
+            city_id=self.city.id, amenity_ids="wifi", number_rooms=1)
+        self.assertEqual(query.all(), [self.places[2]])
+
+    def test_scan_and_get_paths(self):
+        """
+        Test queries without a usable index.
+        """
+        query = self.storage.query(Place).filter(name="d")
+        self.assertEqual(query.explain(), "scan Place (4 objects), "
+                                          "filter name")
+        self.assertEqual(query.first(), self.places[3])
+        query = self.storage.query(City).filter(id=self.other.id)
+        self.assertEqual(query.explain(), "get City.id")
+        self.assertEqual(query.all(), [self.other])
+        self.assertIsNone(query.filter(name="Reno").first())
+
+    def test_keyset_pages(self):
+        """
+        Test walking a query page by page with after().
+        """
+        query = self.storage.query(Place).order_by("name", "id")
+        pages = []
+        page = query.limit(3).all()
+        while page:
+            pages.append([place.name for place in page])
+            last = page[-1]
+            page = query.after(last.name, last.id).limit(3).all()
+        self.assertEqual(pages, [["a", "b", "c"], ["d"]])
+        self.assertEqual(query.after("b", "").explain(),
+                         "scan Place (4 objects), after cursor, "
+                         "order by name, id")
+        with self.assertRaises(ValueError):
+            query.after("b")
+        with self.assertRaises(ValueError):
+            self.storage.query(Place).order_by("name", "-id").after("b", "")
+
+    def test_projection(self):
+        """
+        Test that only() returns records holding the named entries.
+        """
+        query = (self.storage.query(Place).filter(city_id=self.city.id)
+                 .order_by("name").only("name", "created_at", "nope"))
+        self.assertTrue(query.explain().endswith("only name, created_at, "
+                                                 "nope"))
+        records = query.all()
+        self.assertEqual([record["name"] for record in records],
+                         ["a", "b", "c"])
+        full = self.places[1].to_dict()
+        self.assertEqual(records[0], {"name": "a",
+                                      "created_at": full["created_at"]})
+
+    def test_load_plan(self):
+        """
+        Test that load plans are recorded and validated.
+        """
+        query = self.storage.query(City).load("places")
+        self.assertEqual(query.loads, {"places": "selectin"})
+        self.assertTrue(query.explain().endswith("relationships indexed: "
+                                                 "places"))
+        self.assertEqual(len(query.all()), 2)
+        with self.assertRaises(ValueError):
+            query.load("places", strategy="lazy")
+
+    def test_aggregate(self):
+        """
+        Test grouped and whole-class aggregates.
+        """
+        result = self.storage.query(Place).aggregate(
+            group_by="city_id", places=("count", "id"),
+            rooms=("avg", "number_rooms"), top=("max", "number_rooms"),
+            low=("min", "number_rooms"))
+        self.assertEqual(result[self.city.id], {"places": 3, "rooms": 5 / 3,
+                                                "top": 2, "low": 1})
+        self.assertEqual(result[self.other.id]["places"], 1)
+        empty = self.storage.query(Place).filter(name="none").aggregate(
+            places=("count", "id"), top=("max", "number_rooms"))
+        self.assertEqual(empty, {"places": 0, "top": None})
+        with self.assertRaises(ValueError):
+            self.storage.query(Place).aggregate(total=("sum", "id"))
+        self.assertEqual(self.storage.counts([Place, "City", "State"]),
+                         {"Place": 4, "City": 2, "State": 0})
+
+
+class TestFileStorageRelations(unittest.TestCase):
+    """
+    Test cases for the reverse foreign key indexes of FileStorage.
+    """
+
+    def setUp(self):
+        """
+        Set up a state with a city and a place with a review.
+        """
+        self.storage = models.storage
+        self.state = State(name="California")
+        self.city = City(name="San Francisco", state_id=self.state.id)
+        self.place = Place(name="Loft", city_id=self.city.id)
+        self.review = Review(text="Nice", place_id=self.place.id)
+        self.amenity = Amenity(name="Wifi")
+        for obj in (self.state, self.city, self.place, self.review,
+                    self.amenity):
+            self.storage.new(obj)
+
+    def tearDown(self):
+        """
+        Remove the objects created by the test.
+        """
+        for obj in (self.state, self.city, self.place, self.review,
+                    self.amenity):
+            self.storage.delete(obj)
+        try:
+            os.remove("file.json")
+        except FileNotFoundError:
+            pass
+
+    def test_state_cities(self):
+        """
+        Test that State.cities follows city creation, moves and deletes.
+        """
+        self.assertEqual(self.state.cities, [self.city])
+        other = State(name="Nevada")
+        self.storage.new(other)
+        self.city.state_id = other.id
+        self.storage.new(self.city)
+        self.assertEqual(self.state.cities, [])
+        self.assertEqual(other.cities, [self.city])
+        self.storage.delete(self.city)
+        self.storage.delete(other)
+        self.assertEqual(other.cities, [])
+
+    def test_moved_city_saved_without_new(self):
+        """
+        Test that saving a city whose state_id changed moves it between
+        the cities of the two states.
+        """
+        other = State(name="Nevada")
+        self.storage.new(other)
+        self.city.state_id = other.id
+        self.storage.save()
+        self.assertEqual(self.state.cities, [])
+        self.assertEqual(other.cities, [self.city])
+        self.assertEqual(self.storage.query(City).filter(
+            state_id=self.state.id).all(), [])
+        self.storage.delete(other)
+
+    def test_place_reviews(self):
+        """
+        Test that Place.reviews uses the place_id index.
+        """
+        self.assertEqual(self.place.reviews, [self.review])
+        self.assertEqual(
+            self.storage.related(Review, "place_id", self.place.id),
+            [self.review])
+
+    def test_place_amenities(self):
+        """
+        Test linking an amenity to a place.
+        """
+        self.assertEqual(self.place.amenities, [])
+        self.place.amenities = self.amenity
+        self.place.amenities = self.amenity
+        self.assertEqual(self.place.amenity_ids, [self.amenity.id])
+        self.assertEqual(self.place.amenities, [self.amenity])
+        self.assertEqual(Place.amenity_ids, [])
+        self.assertEqual(
+            self.storage.related(Place, "amenity_ids", self.amenity.id),
+            [self.place])
+
+
+class TestFileStorageLazy(unittest.TestCase):
+    """
+    Test cases for lazy hydration in FileStorage.reload.
+    """
+
+    def setUp(self):
+        """
+        Save a state with two cities, then reload them lazily.
+        """
+        self.storage = FileStorage()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__index = {}
+        self.state = State(name="California")
+        self.cities = [City(name=name, state_id=self.state.id)
+                       for name in ("Fremont", "Napa")]
+        for obj in [self.state] + self.cities:
+            self.storage.new(obj)
+        self.storage.save()
+        FileStorage._FileStorage__lazy = True
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__index = {}
+        FileStorage._FileStorage__signature = None
+        self.storage.reload()
+
+    def tearDown(self):
+        """
+        Restore eager hydration and remove the file.
+        """
+        FileStorage._FileStorage__lazy = False
+        self.storage.all()
+        try:
+            os.remove("file.json")
+        except FileNotFoundError:
+            pass
+
+    def test_reload_does_not_hydrate(self):
+        """
+        Test that reload and count leave records unhydrated.
+        """
+        hydrated = self.storage.hydrated
+        self.assertEqual(self.storage.count(City), 2)
+        self.assertEqual(self.storage.hydrated, hydrated)
+
+    def test_get_hydrates_one_object(self):
+        """
+        Test that get builds only the requested instance, once.
+        """
+        hydrated = self.storage.hydrated
+        state = self.storage.get(State, self.state.id)
+        self.assertIsInstance(state, State)
+        self.assertIs(self.storage.get(State, self.state.id), state)
+        self.assertEqual(self.storage.hydrated, hydrated + 1)
+        self.assertEqual(sorted(c.name for c in state.cities),
+                         ["Fremont", "Napa"])
+        self.assertEqual(self.storage.hydrated, hydrated + 3)
+
+    def test_save_keeps_raw_records(self):
+        """
+        Test that save writes unhydrated records back unchanged.
+        """
+        hydrated = self.storage.hydrated
+        self.storage.save()
+        self.assertEqual(self.storage.hydrated, hydrated)
+        with open("file.json", "r") as f:
+            data = json.load(f)
+        key = "City." + self.cities[0].id
+        self.assertEqual(data[key], self.cities[0].to_dict())
+
+    def test_all_hydrates_everything(self):
+        """
+        Test that all returns model instances only.
+        """
+        for obj in self.storage.all().values():
+            self.assertNotIsInstance(obj, dict)
+
+
+class TestFileStorageSharded(unittest.TestCase):
+    """
+    Test cases for the sharded layout of FileStorage.
+    """
+
+    def setUp(self):
+        """
+        Switch storage to a sharded layout in a temporary directory.
+        """
+        self.storage = FileStorage()
+        self.shard_dir = tempfile.mkdtemp()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__index = {}
+        FileStorage._FileStorage__pending = {}
+        FileStorage._FileStorage__shard_signatures = {}
+        FileStorage._FileStorage__shard_dir = self.shard_dir
+        FileStorage._FileStorage__partitions = 2
+        self.states = [State(name=str(i)) for i in range(6)]
+        self.user = User(email="a@b.c", password="pwd")
+        for obj in self.states + [self.user]:
+            self.storage.new(obj)
+        self.storage.save()
+
+    def tearDown(self):
+        """
+        Restore the single file layout.
+        """
+        FileStorage._FileStorage__shard_dir = None
+        FileStorage._FileStorage__partitions = 1
+        shutil.rmtree(self.shard_dir)
+
+    def shards(self):
+        """
+        Return the names of the shard files.
+        """
+        return sorted(name for name in os.listdir(self.shard_dir)
+                      if name.endswith(".json"))
+
+    def stat_shards(self):
+        """
+        Return the mtime of every shard file.
+        """
+        return {name: os.stat(os.path.join(self.shard_dir, name))
+                .st_mtime_ns for name in self.shards()}
+
+    def test_one_file_per_class_partition(self):
+        """
+        Test that objects are split by class and hashed id.
+        """
+        names = self.shards()
+        for name in names:
+            cls, part, ext = name.split(".")
+            self.assertIn(cls, ("State", "User"))
+            self.assertIn(part, ("0", "1"))
+        stored = {}
+        for name in names:
+            with open(os.path.join(self.shard_dir, name), "r") as f:
+                stored.update(json.load(f))
+        self.assertEqual(len(stored), 7)
+
+    def test_save_rewrites_dirty_shards_only(self):
+        """
+        Test that adding an object leaves other classes untouched.
+        """
+        before = self.stat_shards()
+        review = Review(text="Nice")
+        self.storage.new(review)
+        self.storage.save()
+        after = self.stat_shards()
+        for name, mtime in before.items():
+            self.assertEqual(after[name], mtime)
+        self.assertEqual(len(after), len(before) + 1)
+
+    def test_reload_changed_and_removed_shards(self):
+        """
+        Test that reload merges edited shards and drops removed ones.
+        """
+        path = os.path.join(self.shard_dir, self.shards()[0])
+        with open(path, "r") as f:
+            data = json.load(f)
+        key = next(iter(data))
+        data[key]["name"] = "changed"
+        with open(path, "w") as f:
+            json.dump(data, f)
+        self.storage.reload()
+        self.assertEqual(self.storage.all()[key].name, "changed")
+        os.remove(path)
+        self.storage.reload()
+        for key in data:
+            self.assertNotIn(key, self.storage.all())
+        self.assertEqual(self.storage.count(), 7 - len(data))
+
+    def test_reload_from_scratch(self):
+        """
+        Test that a fresh process loads every shard.
+        """
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__index = {}
+        FileStorage._FileStorage__shard_signatures = {}
+        self.storage.reload()
+        self.assertEqual(self.storage.count(State), 6)
+        self.assertEqual(self.storage.get(User, self.user.id).email,
+                         "a@b.c")
+
+
+class TestFileStorageWriteBehind(unittest.TestCase):
+    """
+    Test cases for dirty tracking and write-behind flushing.
+    """
+
+    def setUp(self):
+        """
+        Save one state to a fresh journaled file.
+        """
+        self.storage = FileStorage()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__index = {}
+        FileStorage._FileStorage__pending = {}
+        FileStorage._FileStorage__journal = True
+        self.state = State(name="California")
+        self.storage.new(self.state)
+        self.storage.save()
+
+    def tearDown(self):
+        """
+        Stop the flusher and remove written files.
+        """
+        FileStorage._FileStorage__journal = False
+        FileStorage._FileStorage__write_behind = 0
+        FileStorage._FileStorage__write_behind_max = 1000
+        FileStorage._FileStorage__wakeup.set()
+        flusher = FileStorage._FileStorage__flusher
+        if flusher is not None:
+            flusher.join(5)
+        atexit.unregister(self.storage.flush)
+        for path in ("file.json", "file.json.log", "file.json.lock"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def journal(self):
+        """
+        Return the records of the journal, without its header.
+        """
+        try:
+            with open("file.json.log", "r") as f:
+                return [json.loads(line) for line in f][1:]
+        except FileNotFoundError:
+            return []
+
+    def test_save_persists_dirty_objects(self):
+        """
+        Test that a modified object is journaled without calling new.
+        """
+        self.state.name = "Nevada"
+        self.storage.save()
+        records = self.journal()
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["value"]["name"], "Nevada")
+        self.storage.save()
+        self.assertEqual(len(self.journal()), 1)
+
+    def test_write_behind_defers_until_flush(self):
+        """
+        Test that save only queues changes in write-behind mode.
+        """
+        FileStorage._FileStorage__write_behind = 60
+        other = State(name="Oregon")
+        self.storage.new(other)
+        self.storage.save()
+        self.state.name = "Nevada"
+        self.storage.save()
+        self.assertEqual(self.journal(), [])
+        self.storage.reload()
+        self.assertIs(self.storage.get(State, other.id), other)
+        self.storage.flush()
+        keys = sorted(record["key"] for record in self.journal())
+        self.assertEqual(keys, sorted(["State." + other.id,
+                                       "State." + self.state.id]))
+
+    def test_flusher_survives_idle_intervals(self):
+        """
+        Test that the flusher keeps running through intervals with
+        nothing queued and no journal, and flushes later saves.
+        """
+        FileStorage._FileStorage__write_behind = 0.05
+        self.storage.save()
+        time.sleep(0.2)
+        self.assertTrue(FileStorage._FileStorage__flusher.is_alive())
+        other = State(name="Oregon")
+        self.storage.new(other)
+        self.storage.save()
+        for i in range(50):
+            if self.journal():
+                break
+            time.sleep(0.1)
+        self.assertEqual([record["key"] for record in self.journal()],
+                         ["State." + other.id])
+
+    def test_write_behind_threshold_wakes_flusher(self):
+        """
+        Test that reaching the dirty threshold triggers a flush.
+        """
+        FileStorage._FileStorage__write_behind = 60
+        FileStorage._FileStorage__write_behind_max = 2
+        for name in ("Oregon", "Texas"):
+            self.storage.new(State(name=name))
+        self.storage.save()
+        for i in range(50):
+            if len(self.journal()) == 2:
+                break
+            time.sleep(0.1)
+        self.assertEqual(len(self.journal()), 2)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+import unittest
+import io
+import json
+from models.engine import json_stream
+
+
+class TestJsonStream(unittest.TestCase):
+    """
+    Test cases for the incremental JSON reader and writer.
+    """
+
+    def setUp(self):
+        """
+        Set up records holding nested values and tricky strings.
+        """
+        self.records = {
+            "State.1": {"id": "1", "name": "Cali, \"fornia\"",
+                        "__class__": "State"},
+            "Place.2": {"id": "2", "amenity_ids": ["a", "b"],
+                        "latitude": 37.77, "nested": {"}": "{"}},
+            "User.3": {"id": "3", "first_name": "Boëlle\n"},
+        }
+
+    def dump(self, records):
+        """
+        Serialize records with dump_items and return the text.
+        """
+        fd = io.StringIO()
+        written = list(json_stream.dump_items(fd, records.items()))
+        self.assertEqual([key for key, text in written], list(records))
+        return fd.getvalue()
+
+    def test_dump_is_valid_json(self):
+        """
+        Test that the written text is the JSON object of the records.
+        """
+        self.assertEqual(json.loads(self.dump(self.records)), self.records)
+        self.assertEqual(json.loads(self.dump({})), {})
+
+    def test_round_trip_small_chunks(self):
+        """
+        Test that records split across many chunks are parsed back.
+        """
+        text = self.dump(self.records)
+        for chunk_size in (1, 3, 7, 64):
+            items = json_stream.load_items(io.StringIO(text), chunk_size)
+            self.assertEqual(dict(items), self.records)
+
+    def test_load_json_dump_output(self):
+        """
+        Test reading files written by json.dump, with or without indent.
+        """
+        for indent in (None, 4):
+            text = json.dumps(self.records, indent=indent)
+            items = json_stream.load_items(io.StringIO(text), 5)
+            self.assertEqual(dict(items), self.records)
+        items = json_stream.load_items(io.StringIO(" { } "), 2)
+        self.assertEqual(list(items), [])
+
+    def test_load_fingerprints(self):
+        """
+        Test that records read back hash like the text written for them.
+        """
+        fd = io.StringIO()
+        written = dict(json_stream.dump_items(fd, self.records.items()))
+        for chunk_size in (3, 64):
+            fingerprints = {}
+            list(json_stream.load_items(io.StringIO(fd.getvalue()),
+                                        chunk_size, fingerprints))
+            self.assertEqual(fingerprints, {key: hash(text) for key, text
+                                            in written.items()})
+
+    def test_load_truncated_file(self):
+        """
+        Test that a truncated file raises a decoding error.
+        """
+        text = self.dump(self.records)[:-10]
+        with self.assertRaises(json.JSONDecodeError):
+            list(json_stream.load_items(io.StringIO(text), 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
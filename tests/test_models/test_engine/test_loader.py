@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+import io
+import os
+import unittest
+from models.engine import loader
+from models.engine.file_storage import FileStorage
+from models.city import City
+from models.place import Place
+from models.user import User
+
+
+class TestLoader(unittest.TestCase):
+    """
+    Test cases for the streaming bulk loader.
+    """
+
+    def setUp(self):
+        """
+        Store a city and a user for the loaded places to refer to.
+        """
+        self.storage = FileStorage()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__index = {}
+        FileStorage._FileStorage__related = {}
+        FileStorage._FileStorage__links = {}
+        self.city = City(name="Reno")
+        self.user = User(email="a@b.c", password="pwd")
+        self.storage.new(self.city)
+        self.storage.new(self.user)
+
+    def tearDown(self):
+        """
+        Remove the saved files.
+        """
+        for path in ("file.json", "file.json.lock"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_load_jsonl_in_batches(self):
+        """
+        Test that JSON lines are created in batches and saved once.
+        """
+        lines = "".join('{{"city_id": "{}", "user_id": "{}", "name": "p{}"}}'
+                        '\n'.format(self.city.id, self.user.id, i)
+                        for i in range(5))
+        batches = []
+        count = loader.load(self.storage, "Place", io.StringIO(lines + "\n"),
+                            batch_size=2, report=batches.append)
+        self.assertEqual(count, 5)
+        self.assertEqual(batches, [2, 4, 5])
+        self.assertEqual(self.storage.count(Place), 5)
+        self.assertTrue(os.path.exists("file.json"))
+
+    def test_load_csv_converts_types(self):
+        """
+        Test that CSV cells take the type of their attribute.
+        """
+        rows = ("city_id,user_id,name,number_rooms,latitude,amenity_ids\n"
+                "{0},{1},Loft,3,1.5,a;b\n{0},{1},Flat,,,\n").format(
+                    self.city.id, self.user.id)
+        loader.load(self.storage, "Place", io.StringIO(rows), True)
+        loft = self.storage.query(Place).filter(name="Loft").first()
+        self.assertEqual((loft.number_rooms, loft.latitude, loft.amenity_ids),
+                         (3, 1.5, ["a", "b"]))
+        flat = self.storage.query(Place).filter(name="Flat").first()
+        self.assertNotIn("number_rooms", flat.__dict__)
+
+    def test_missing_foreign_key(self):
+        """
+        Test that a batch naming a missing object is rejected whole.
+        """
+        lines = ('{{"city_id": "{0}", "user_id": "{1}", "name": "ok"}}\n'
+                 '{{"city_id": "nope", "user_id": "{1}", "name": "bad"}}\n'
+                 ).format(self.city.id, self.user.id)
+        with self.assertRaisesRegex(ValueError, "line 2: no City nope"):
+            loader.load(self.storage, "Place", io.StringIO(lines))
+        self.assertEqual(self.storage.count(Place), 0)
+        with self.assertRaisesRegex(ValueError, "line 1: invalid JSON"):
+            loader.load(self.storage, "Place", io.StringIO("{\n"))
+
+    def test_failed_batch_discards_earlier_batches(self):
+        """
+        Test that a batch failing after others leaves nothing to save.
+        """
+        lines = ('{{"city_id": "{0}", "user_id": "{1}", "name": "ok"}}\n'
+                 '{{"city_id": "nope", "user_id": "{1}", "name": "bad"}}\n'
+                 ).format(self.city.id, self.user.id)
+        with self.assertRaisesRegex(ValueError, "line 2: no City nope"):
+            loader.load(self.storage, "Place", io.StringIO(lines),
+                        batch_size=1)
+        self.assertEqual(self.storage.count(Place), 0)
+        self.storage.save()
+        with open("file.json", "r") as f:
+            self.assertNotIn('"ok"', f.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+import unittest
+from sqlalchemy import (create_engine, inspect, Column, DateTime, ForeignKey,
+                        MetaData, String, Table)
+from models.engine import migrations
+
+
+class TestMigrations(unittest.TestCase):
+    """
+    Test cases for the versioned schema migration runner.
+    """
+
+    def setUp(self):
+        """
+        Create the version 0 tables in an in-memory database.
+        """
+        self.engine = create_engine("sqlite://")
+        self.create_tables(Column("user_id", String(60)))
+
+    def create_tables(self, user_id):
+        """
+        Create the tables indexed, reviews.user_id being the given
+        column.
+        """
+        metadata = MetaData()
+        for table, columns in (("cities", ("state_id", "name")),
+                               ("places", ("city_id", "user_id")),
+                               ("reviews", ("place_id",)),
+                               ("users", ("email",))):
+            Table(table, metadata, Column("id", String(60), primary_key=True),
+                  Column("created_at", DateTime),
+                  *(Column(column, String(60)) for column in columns))
+        metadata.tables["places"].append_column(
+            Column("price_by_night", String(60)))
+        metadata.tables["reviews"].append_column(user_id)
+        metadata.create_all(self.engine)
+
+    def index_names(self):
+        """
+        Return the names of the indexes of the database.
+        """
+        inspector = inspect(self.engine)
+        return {index["name"] for table in inspector.get_table_names()
+                for index in inspector.get_indexes(table)}
+
+    def test_upgrade_and_downgrade(self):
+        """
+        Test that migrations move the schema between versions.
+        """
+        self.assertEqual(migrations.current_version(self.engine), 0)
+        self.assertEqual(migrations.migrate(self.engine), [(1, "upgrade")])
+        self.assertIn("ix_places_city_id_price_by_night", self.index_names())
+        self.assertEqual(migrations.current_version(self.engine), 1)
+        self.assertEqual(migrations.migrate(self.engine), [])
+        self.assertEqual(migrations.migrate(self.engine, 0),
+                         [(1, "downgrade")])
+        self.assertNotIn("ix_users_email", self.index_names())
+        with self.assertRaises(ValueError):
+            migrations.migrate(self.engine, 99)
+
+    def test_downgrade_keeps_foreign_key_index(self):
+        """
+        Test that an index backing a foreign key is not dropped.
+        """
+        self.engine = create_engine("sqlite://")
+        self.create_tables(Column("user_id", String(60),
+                                  ForeignKey("users.id")))
+        migrations.migrate(self.engine)
+        migrations.migrate(self.engine, 0)
+        self.assertEqual(self.index_names() & {"ix_reviews_user_id",
+                                               "ix_places_user_id"},
+                         {"ix_reviews_user_id"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/python3
+import unittest
+from datetime import datetime
+from models.base_model import BaseModel
+from models.engine import model_codec
+from models.place import Place
+
+
+class TestModelCodec(unittest.TestCase):
+    """
+    Test cases for the per-class model codec.
+    """
+
+    def setUp(self):
+        """
+        Set up a place with extra attributes.
+        """
+        self.place = Place(name="Loft", city_id="c1", number_rooms=3,
+                           amenity_ids=["a"])
+        self.place.nickname = "extra"
+        self.codec = model_codec.for_class(Place)
+
+    def test_round_trip(self):
+        """
+        Test that a decoded record equals the instance it came from.
+        """
+        record = self.place.to_dict()
+        obj = self.codec.decode(record)
+        self.assertIsInstance(obj, Place)
+        self.assertEqual(obj.__dict__, self.place.__dict__)
+        self.assertEqual(obj.to_dict(), record)
+        self.assertEqual(record["__class__"], "Place")
+        self.assertNotIn("_stamps", record)
+        self.assertEqual(BaseModel.pop_dirty().get(obj), None)
+
+    def test_decode_matches_init(self):
+        """
+        Test that decode builds the same object as the constructor.
+        """
+        record = {"id": "1", "created_at": "2017-06-14T22:31:03.285259",
+                  "updated_at": "2017-06-14T22:31:03.285259",
+                  "name": "Loft", "__class__": "Place"}
+        self.assertEqual(self.codec.decode(record).__dict__,
+                         Place(**record).__dict__)
+        obj = self.codec.decode({"name": "Loft"})
+        self.assertTrue(obj.id)
+        self.assertIsInstance(obj.created_at, datetime)
+
+    def test_cached_timestamps_follow_updates(self):
+        """
+        Test that cached timestamps are refreshed when a date changes.
+        """
+        first = self.place.to_dict()
+        self.assertIs(self.place.to_dict()["updated_at"], first["updated_at"])
+        self.place.updated_at = datetime(2020, 1, 2, 3, 4, 5)
+        self.assertEqual(self.place.to_dict()["updated_at"],
+                         "2020-01-02T03:04:05.000000")
+        self.assertEqual(self.place.to_dict()["created_at"],
+                         first["created_at"])
+
+    def test_project(self):
+        """
+        Test that a projection matches the same entries of to_dict.
+        """
+        fields = ("id", "__class__", "updated_at", "amenity_ids", "none")
+        record = self.place.to_dict()
+        self.assertEqual(self.codec.project(self.place.__dict__, fields),
+                         {field: record[field] for field in fields[:4]})
+
+    def test_fields(self):
+        """
+        Test that fields holds the entries of to_dict, apart from extra
+        attributes, and no methods, properties or relationships.
+        """
+        self.assertLessEqual(set(self.place.to_dict()) - {"nickname"},
+                             self.codec.fields)
+        self.assertNotIn("nickname", self.codec.fields)
+        for name in ("reviews", "amenities", "save", "metadata", "_cache"):
+            self.assertNotIn(name, self.codec.fields)
+
+    def test_parse_datetime(self):
+        """
+        Test the ISO fast path against the to_dict format.
+        """
+        now = datetime.now()
+        text = now.strftime(model_codec.DATETIME_FORMAT)
+        self.assertEqual(model_codec.format_datetime(now), text)
+        self.assertEqual(model_codec.parse_datetime(text), now)
+        self.assertIs(model_codec.parse_datetime(now), now)
+        self.assertEqual(model_codec.parse_datetime("2017-06-14T22:31:03.5"),
+                         datetime(2017, 6, 14, 22, 31, 3, 500000))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+import os
 from models.place import Place
 from datetime import datetime
 import uuid
@@ -97,6 +98,20 @@ class TestPlace(unittest.TestCase):
         self.assertEqual(place_dict["updated_at"],
                          self.place.updated_at.isoformat())
 
+    @unittest.skipIf(os.getenv("HBNB_TYPE_STORAGE") == "db",
+                     "models are mapped in db mode")
+    def test_compact_instance(self):
+        """
+        Test that file mode instances only hold their own attributes.
+        """
+        place = Place(name="Loft", city_id="c1")
+        place.nickname = "extra"
+        self.assertEqual(set(place.__dict__),
+                         {"id", "created_at", "updated_at", "name",
+                          "city_id", "nickname"})
+        self.assertEqual(place.to_dict()["nickname"], "extra")
+        self.assertEqual(place.number_rooms, 0)
+
 
 if __name__ == '__main__':
     unittest.main()
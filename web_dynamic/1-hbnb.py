@@ -19,8 +19,7 @@ def hbnb():
     Display a HTML page with dynamic filters, like 8-index.html, with States,
     Cities, Amenities, and Places.
     """
-    states = sorted(storage.all(State).values(),
-                    key=lambda state: state.name)
+    states = storage.query(State).order_by("name").load("cities").all()
     amenities = sorted(storage.all(Amenity).values(),
                        key=lambda amenity: amenity.name)
     places = sorted(storage.all(Place).values(),
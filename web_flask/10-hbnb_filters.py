@@ -17,8 +17,7 @@ def hbnb_filters():
     Display a HTML page like 6-index.html, with States,
     Cities and Amenities filters.
     """
-    states = sorted(storage.all(State).values(),
-                    key=lambda state: state.name)
+    states = storage.query(State).order_by("name").load("cities").all()
     amenities = sorted(storage.all(Amenity).values(),
                        key=lambda amenity: amenity.name)
     return render_template('10-hbnb_filters.html', states=states,